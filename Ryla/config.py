@@ -8,6 +8,94 @@ class Settings(BaseSettings):
     firebase_credentials_path: str = r"C:\Users\DAN\OneDrive\Desktop\Git Up\Project-MWS-01\Ryla\Firebase_connection.json"
     firebase_database_url: str = "https://rylaang-64c80-default-rtdb.asia-southeast1.firebasedatabase.app/"
     model_cache_dir: str = "./model_cache"
+    # "firebase" (Realtime Database) or "memory" (process-local stand-in)
+    profile_backend: str = "firebase"
+    profile_cache_ttl_seconds: float = 300
+    profile_cache_max_entries: int = 10000
+    profile_listen_invalidation: bool = False
+    # "torch", "torch_int8" (dynamic int8 quantization, CPU) or "onnx" (needs optimum[onnxruntime])
+    inference_backend: str = "torch"
+    grammar_batch_window_ms: float = 20.0
+    grammar_batch_max_size: int = 8
+    inference_workers: int = 2
+    inference_queue_depth: int = 16
+    torch_intra_op_threads: int = 0
+    # Greedy/beam decoding without sampling; required for cached outputs to be reused
+    deterministic_decoding: bool = True
+    # Beam widths used while generate() latency is within the SLO
+    grammar_max_beams: int = 5
+    response_max_beams: int = 4
+    # Target generate() latency per input-length bucket; slower buckets decode with fewer beams, 0 disables
+    generation_latency_slo_ms: float = 2000.0
+    response_cache_enabled: bool = True
+    response_cache_max_entries: int = 4096
+    response_cache_ttl_seconds: float = 86400
+    response_cache_path: str = ""
+    speculative_response: bool = False
+    speculative_max_edit_ratio: float = 0.2
+    vosk_model_path_fr: str = r"..\Ryla\vosk-model-small-fr-0.22"
+    vosk_model_path_en: str = r"..\Ryla\vosk-model-small-en-us-0.15"
+    stt_recognizers_per_language: int = 4
+    stt_concurrency_per_core: int = 1
+    # "thread" decodes uploads in this process, "process" in worker processes with their own models
+    stt_executor: str = "thread"
+    # Worker processes for stt_executor="process", 0 for one per CPU core
+    stt_process_workers: int = 0
+    # Silence trimming before recognition of uploads: "off", "energy" or "webrtc" (needs webrtcvad)
+    stt_vad_mode: str = "energy"
+    stt_vad_padding_ms: int = 300
+    # How far above the noise floor (10th percentile frame energy) a frame counts as speech
+    stt_vad_energy_margin_db: float = 6.0
+    # Longer stretches of speech are split so their parts decode in parallel
+    stt_vad_max_segment_seconds: float = 15.0
+    # Transcripts of batch jobs keyed by audio content hash; empty for model_cache_dir/transcripts.sqlite
+    stt_transcript_cache_path: str = ""
+    stt_transcript_cache_max_entries: int = 10000
+    # Trailing silence after which streaming recognition closes an utterance
+    stt_endpoint_silence_seconds: float = 0.3
+    # "memory" (per process, LRU + idle TTL) or "redis" (shared by all workers, needs the redis package)
+    session_backend: str = "memory"
+    session_max_entries: int = 10000
+    session_idle_ttl_seconds: float = 3600
+    redis_url: str = "redis://localhost:6379/0"
+    session_key_prefix: str = "ryla:session:"
+    # Token budget of the per-session conversation history given to the chat model, 0 disables it
+    conversation_max_tokens: int = 120
+    # Comma-separated languages loaded and warmed up at startup, empty to load lazily
+    preload_languages: str = "en,fr"
+    greeting_pool_size: int = 5
+    greeting_max_age_seconds: float = 3600
+    greeting_refresh_interval_seconds: float = 600
+    # Ordered fallback chain of translation backends: "mymemory", "argos" (in-process, needs argostranslate)
+    translation_backends: str = "mymemory"
+    argos_workers: int = 2
+    # Language pairs whose Argos translators are loaded at startup
+    argos_preload_pairs: str = "en-fr,fr-en"
+    # Exact-match translation memory in front of the backends
+    translation_memory_enabled: bool = True
+    translation_memory_max_entries: int = 20000
+    translation_memory_ttl_seconds: float = 604800
+    # Optional SQLite file so remembered translations survive restarts
+    translation_memory_path: str = ""
+    # Phrase list (one per line) translated into every prewarm pair at startup
+    translation_memory_prewarm_path: str = ""
+    translation_memory_prewarm_pairs: str = "en-fr,fr-en"
+    # Limits of /translate_batch: texts per request and translations in flight per request
+    translation_batch_max_size: int = 128
+    translation_batch_concurrency: int = 8
+    # Consecutive failures that open a translation backend's circuit, and seconds before it is probed again
+    translation_breaker_failure_threshold: int = 5
+    translation_breaker_reset_seconds: float = 30.0
+    # Race slow MyMemory calls with a second request once they pass this latency percentile; 0 disables
+    translation_hedge_percentile: float = 95.0
+    translation_hedge_min_delay_ms: float = 50.0
+    # MyMemory endpoint; point at a local stub server for tests
+    mymemory_url: str = "https://api.mymemory.translated.net/get"
+    translation_pool_limit: int = 100
+    translation_pool_limit_per_host: int = 20
+    translation_dns_ttl_seconds: int = 300
+    translation_keepalive_seconds: float = 30
+    translation_timeout_seconds: float = 10
 
     class Config:
         env_file = ".env"
@@ -1,41 +1,113 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import firebase_admin
-from firebase_admin import credentials, db
+from firebase_admin import credentials
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
-from fastapi.responses import JSONResponse
-from src.translation_service import TranslationService
+from typing import Optional, Dict, Any, List
+from fastapi.responses import JSONResponse, StreamingResponse
+from src.translation_service import ArgosBackend, MyMemoryBackend, TranslationService, load_phrases
 from src.assistant import MultilingualAssistant
+from src.inference_executor import InferenceQueueFull
+from src.audio_decoding import AudioDecodeError, StreamingDecoder, decode_to_pcm
+from src.speech_recognition import SpeechRecognizer
+from src.vad import VoiceActivityDetector
+from src.batch_transcription import BatchTranscriber
+from src.response_cache import ResponseCache
+from src.profile_cache import FirebaseProfileBackend, InMemoryProfileBackend, UserProfileCache
+from src.session_store import InMemorySessionStore, RedisSessionStore
 import asyncio
 import traceback
-import tempfile
 import os
-import wave
 import json
 import logging
+from contextlib import ExitStack
 from datetime import datetime
-from vosk import Model, KaldiRecognizer
-from pydub import AudioSegment
-from pydub.utils import which
 from config import get_settings
 from firebase_admin import auth as firebase_auth
 from fastapi import Header
 
 # Initialize services and settings
 settings = get_settings()
-translation_service = TranslationService()
-assistant = MultilingualAssistant()
-AudioSegment.converter = which("ffmpeg") or r"..\\..\\FFmpeg\\bin\\ffmpeg.exe"
+
+def parse_pairs(value: str):
+    return [tuple(pair.strip().split("-", 1)) for pair in value.split(",") if "-" in pair]
+
+def build_translation_backends():
+    backends = []
+    for name in [name.strip() for name in settings.translation_backends.split(",") if name.strip()]:
+        if name == "mymemory":
+            backends.append(MyMemoryBackend(
+                url=settings.mymemory_url,
+                pool_limit=settings.translation_pool_limit,
+                pool_limit_per_host=settings.translation_pool_limit_per_host,
+                dns_ttl_seconds=settings.translation_dns_ttl_seconds,
+                keepalive_seconds=settings.translation_keepalive_seconds,
+                timeout_seconds=settings.translation_timeout_seconds
+            ))
+        elif name == "argos":
+            backends.append(ArgosBackend(max_workers=settings.argos_workers, preload_pairs=parse_pairs(settings.argos_preload_pairs)))
+        else:
+            logging.warning(f"Unknown translation backend '{name}' ignored")
+    return backends
+
+translation_service = TranslationService(
+    build_translation_backends(),
+    memory=ResponseCache(
+        max_entries=settings.translation_memory_max_entries,
+        ttl_seconds=settings.translation_memory_ttl_seconds,
+        db_path=settings.translation_memory_path or None,
+        name="translation_memory"
+    ) if settings.translation_memory_enabled else None,
+    breaker_failure_threshold=settings.translation_breaker_failure_threshold,
+    breaker_reset_seconds=settings.translation_breaker_reset_seconds,
+    hedge_percentile=settings.translation_hedge_percentile or None,
+    hedge_min_delay_ms=settings.translation_hedge_min_delay_ms
+)
+# "memory" swaps the Realtime Database for a process-local store (tests, offline runs)
+profile_backend = InMemoryProfileBackend() if settings.profile_backend == "memory" else FirebaseProfileBackend()
+profile_cache = UserProfileCache(
+    profile_backend,
+    ttl_seconds=settings.profile_cache_ttl_seconds,
+    max_entries=settings.profile_cache_max_entries
+)
+session_store = RedisSessionStore(
+    url=settings.redis_url,
+    idle_ttl_seconds=settings.session_idle_ttl_seconds,
+    key_prefix=settings.session_key_prefix
+) if settings.session_backend == "redis" else InMemorySessionStore(
+    max_entries=settings.session_max_entries,
+    idle_ttl_seconds=settings.session_idle_ttl_seconds
+)
+assistant = MultilingualAssistant(profile_cache=profile_cache, session_store=session_store)
+speech = SpeechRecognizer(
+    {"fr": settings.vosk_model_path_fr, "en": settings.vosk_model_path_en},
+    recognizers_per_language=settings.stt_recognizers_per_language,
+    concurrency_per_core=settings.stt_concurrency_per_core,
+    executor=settings.stt_executor,
+    process_workers=settings.stt_process_workers,
+    endpoint_silence_seconds=settings.stt_endpoint_silence_seconds
+)
+vad = VoiceActivityDetector(
+    mode=settings.stt_vad_mode,
+    padding_ms=settings.stt_vad_padding_ms,
+    energy_margin_db=settings.stt_vad_energy_margin_db,
+    max_segment_seconds=settings.stt_vad_max_segment_seconds
+)
+batch_transcriber = BatchTranscriber(
+    speech,
+    vad,
+    ResponseCache(
+        max_entries=settings.stt_transcript_cache_max_entries,
+        ttl_seconds=None,
+        db_path=settings.stt_transcript_cache_path or os.path.join(settings.model_cache_dir, "transcripts.sqlite"),
+        name="transcript_cache"
+    )
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # Global variables
-VOSK_MODEL_PATH_FR = os.environ.get("VOSK_MODEL_PATH_FR", r"..\Ryla\vosk-model-small-fr-0.22")
-_vosk_model_fr = None
-VOSK_MODEL_PATH_EN = os.environ.get("VOSK_MODEL_PATH_EN", r"..\Ryla\vosk-model-small-en-us-0.15")
-_vosk_model_en = None
 firebase_available = False
 
 # Model definitions
@@ -51,6 +123,7 @@ class UserInput(BaseModel):
     language: Optional[str] = 'fr'
     proficiency: Optional[str] = 'intermediate'
     target: Optional[str] = 'grammar_correction'
+    speculative: Optional[bool] = None
 
 class ProcessedResponse(BaseModel):
     original_text: str
@@ -71,40 +144,39 @@ class TranslationResponse(BaseModel):
     success: bool
     error: Optional[str] = None
 
-# Helper functions
-def get_vosk_model_fr():
-    global _vosk_model_fr
-    if _vosk_model_fr is None:
-        try:
-            logging.info(f"Loading French Vosk model from: {VOSK_MODEL_PATH_FR}")
-            _vosk_model_fr = Model(VOSK_MODEL_PATH_FR)
-            logging.info("French Vosk model loaded successfully")
-        except Exception as e:
-            logging.error(f"Failed to load French Vosk model: {str(e)}")
-            raise RuntimeError(f"Could not load French speech recognition model: {str(e)}")
-    return _vosk_model_fr
+class TranslationBatchRequest(BaseModel):
+    texts: List[str]
+    source_language: str
+    target_language: str
+    user_id: Optional[str] = None
 
-def get_vosk_model_en():
-    global _vosk_model_en
-    if _vosk_model_en is None:
-        try:
-            logging.info(f"Loading English Vosk model from: {VOSK_MODEL_PATH_EN}")
-            _vosk_model_en = Model(VOSK_MODEL_PATH_EN)
-            logging.info("English Vosk model loaded successfully")
-        except Exception as e:
-            logging.error(f"Failed to load English Vosk model: {str(e)}")
-            raise RuntimeError(f"Could not load English speech recognition model: {str(e)}")
-    return _vosk_model_en
-
-def get_vosk_model(language):
-    if language == "en":
-        return get_vosk_model_fr()
-    elif language == "fr":
-        return get_vosk_model_en()
-    else:
-        # Default to English if language is not recognized
-        logging.warning(f"Unrecognized language '{language}', defaulting to English model")
-        return get_vosk_model_en()
+class TranslationBatchResponse(BaseModel):
+    translations: List[str]
+    source_language: str
+    target_language: str
+    success: bool
+    error: Optional[str] = None
+
+# Helper functions
+async def run_until_disconnect(request: Request, coro, poll_interval: float = 0.25):
+    """
+    Await coro, cancelling it if the client disconnects before it finishes
+
+    Cancellation propagates into the inference executor, so queued model calls
+    for abandoned requests are dropped instead of occupying a worker.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
 
 async def extract_user_id_from_token(authorization: Optional[str] = Header(None)) -> Optional[str]:
     if not authorization or not authorization.startswith("Bearer "):
@@ -118,6 +190,49 @@ async def extract_user_id_from_token(authorization: Optional[str] = Header(None)
         logging.warning(f"Token verification failed: {str(e)}")
         return None
 
+async def resolve_user_preferences(user_id: str, user_input: UserInput, metadata: Dict[str, Any]):
+    """
+    Resolve (language, proficiency, target) from the request, falling back to the
+    user's stored model_data; records the lookup outcome in metadata
+    """
+    user_data = {
+        'lang_to_learn': "en",
+        'proficiency_level': 'intermediate',
+        'target_use': 'grammar_correction'
+    }
+
+    if profiles_available():
+        try:
+            firebase_data = await profile_cache.get(user_id)
+            
+            if firebase_data:
+                user_data.update(firebase_data)
+                metadata['firebase_status'] = 'success'
+            else:
+                metadata['firebase_status'] = 'no_data'
+        except Exception as e:
+            metadata['firebase_status'] = 'error' if not isinstance(e, asyncio.TimeoutError) else 'timeout'
+    else:
+        metadata['firebase_status'] = 'unavailable'
+
+    language = user_input.language or user_data.get('lang_to_learn', "en")
+    proficiency = user_input.proficiency or user_data.get('proficiency_level', 'intermediate')
+    target = user_input.target or user_data.get('target_use', 'grammar_correction')
+
+    metadata.update({
+        'language': language,
+        'proficiency': proficiency,
+        'target': target,
+        'input_length': len(user_input.text)
+    })
+    return language, proficiency, target
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def profiles_available() -> bool:
+    return firebase_available or settings.profile_backend == "memory"
+
 def initialize_firebase():
     global firebase_available
     try:
@@ -153,9 +268,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def prewarm_speech():
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, speech.prewarm, ["en", "fr"])
+    except Exception as e:
+        # Recorded in speech.prewarm_status, so /ready reports it too
+        logging.error(f"Speech recognition prewarm failed: {str(e)}", exc_info=True)
+
 @app.on_event("startup")
 async def startup_event():
     initialize_firebase()
+    # Open the pooled keep-alive HTTP session used for every translation
+    await translation_service.start()
+    if settings.translation_memory_prewarm_path:
+        try:
+            phrases = load_phrases(settings.translation_memory_prewarm_path)
+            app.state.translation_prewarm_task = asyncio.create_task(
+                translation_service.prewarm(phrases, parse_pairs(settings.translation_memory_prewarm_pairs))
+            )
+        except OSError as e:
+            logging.warning(f"Could not read translation phrase list: {str(e)}")
+    # Load Vosk models and create recognizers before the first request needs them
+    app.state.speech_prewarm_task = asyncio.create_task(prewarm_speech())
+    if settings.profile_listen_invalidation and profiles_available():
+        profile_cache.start_listening(asyncio.get_running_loop())
+    assistant.greeting_pool.start()
+    # Warm up in the background so /health answers while models load; /ready gates traffic
+    app.state.warm_up_task = asyncio.create_task(assistant.warm_up())
     logging.info(f"Application started, Firebase availability: {firebase_available}")
 
 @app.exception_handler(HTTPException)
@@ -166,6 +305,7 @@ async def http_exception_handler(request, exc):
 @app.post("/initialize_session")
 async def initialize_session(
     session_data: UserSessionInit,
+    request: Request,
     authorization: Optional[str] = Header(None)
 ):
     start_time = datetime.utcnow()
@@ -177,10 +317,9 @@ async def initialize_session(
         user_data = {}
         firebase_status = "not_attempted"
 
-        if firebase_available:
+        if profiles_available():
             try:
-                user_ref = db.reference(f'users/{user_id}/model_data')
-                user_data = await asyncio.get_event_loop().run_in_executor(None, lambda: user_ref.get() or {})
+                user_data = await profile_cache.get(user_id)
                 firebase_status = "success" if user_data else "no_data"
             except asyncio.TimeoutError:
                 firebase_status = "timeout"
@@ -199,12 +338,12 @@ async def initialize_session(
             proficiency = "intermediate"
 
         models_available = await assistant.check_language_models(language)
-        session_result = await assistant.initialize_user_session(
+        session_result = await run_until_disconnect(request, assistant.initialize_user_session(
             user_id=user_id,
             language=language,
             proficiency=proficiency,
             target=target
-        )
+        ))
 
         processing_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
         session_result["metadata"] = {
@@ -217,6 +356,11 @@ async def initialize_session(
 
         return session_result
 
+    except InferenceQueueFull as e:
+        logging.warning(f"[{request_id}] Rejected session initialization: {str(e)}")
+        raise HTTPException(status_code=429, detail="Server is busy, please retry shortly")
+    except HTTPException:
+        raise
     except Exception as e:
         processing_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
         logging.error(f"[{request_id}] Session initialization failed: {str(e)}", exc_info=True)
@@ -280,9 +424,63 @@ async def translate_text(request: TranslationRequest):
             error=str(e)
         )
 
+@app.post("/translate_batch", response_model=TranslationBatchResponse)
+async def translate_batch(request: TranslationBatchRequest):
+    """
+    Translate a list of texts (e.g. a conversation history) in one round trip
+
+    Duplicate texts are translated once, distinct ones concurrently, and texts
+    already being translated for another request share that request's result.
+    """
+    if len(request.texts) > settings.translation_batch_max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.translation_batch_max_size} texts per batch"
+        )
+
+    if request.source_language == request.target_language:
+        return TranslationBatchResponse(
+            translations=request.texts,
+            source_language=request.source_language,
+            target_language=request.target_language,
+            success=True
+        )
+
+    try:
+        translations = await asyncio.wait_for(
+            translation_service.translate_batch(
+                request.texts,
+                request.source_language,
+                request.target_language,
+                concurrency=settings.translation_batch_concurrency
+            ),
+            timeout=15.0
+        )
+        return TranslationBatchResponse(
+            translations=translations,
+            source_language=request.source_language,
+            target_language=request.target_language,
+            success=True
+        )
+    except asyncio.TimeoutError:
+        logging.warning(f"Batch translation of {len(request.texts)} texts timed out after 15 seconds")
+        error = "Translation service timeout"
+    except Exception as e:
+        logging.error(f"Batch translation error: {str(e)}")
+        error = str(e)
+
+    return TranslationBatchResponse(
+        translations=request.texts,
+        source_language=request.source_language,
+        target_language=request.target_language,
+        success=False,
+        error=error
+    )
+
 @app.post("/process_text")
 async def process_text(
     user_input: UserInput,
+    request: Request,
     authorization: Optional[str] = Header(None)
 ) -> ProcessedResponse:
     if not user_input.text.strip():
@@ -297,37 +495,7 @@ async def process_text(
             'firebase_available': firebase_available
         }
 
-        user_data = {
-            'lang_to_learn': "en",
-            'proficiency_level': 'intermediate',
-            'target_use': 'grammar_correction'
-        }
-
-        if firebase_available:
-            try:
-                user_ref = db.reference(f'users/{user_id}/model_data')
-                firebase_data = await asyncio.get_event_loop().run_in_executor(None, lambda: user_ref.get() or {})
-                
-                if firebase_data:
-                    user_data.update(firebase_data)
-                    metadata['firebase_status'] = 'success'
-                else:
-                    metadata['firebase_status'] = 'no_data'
-            except Exception as e:
-                metadata['firebase_status'] = 'error' if not isinstance(e, asyncio.TimeoutError) else 'timeout'
-        else:
-            metadata['firebase_status'] = 'unavailable'
-
-        language = user_input.language or user_data.get('lang_to_learn', "en")
-        proficiency = user_input.proficiency or user_data.get('proficiency_level', 'intermediate')
-        target = user_input.target or user_data.get('target_use', 'grammar_correction')
-
-        metadata.update({
-            'language': language,
-            'proficiency': proficiency,
-            'target': target,
-            'input_length': len(user_input.text)
-        })
+        language, proficiency, target = await resolve_user_preferences(user_id, user_input, metadata)
 
         models_available = await assistant.check_language_models(language)
 
@@ -338,13 +506,20 @@ async def process_text(
             }
             metadata['model_status'] = 'unavailable'
         else:
-            result = await assistant.process_input(
+            result = await run_until_disconnect(request, assistant.process_input(
                 text=user_input.text,
                 language=language,
                 proficiency=proficiency,
-                target=target
-            )
-
+                target=target,
+                speculative=user_input.speculative,
+                user_id=None if user_id == "anonymous" else user_id
+            ))
+            for key in ('response_path', 'correction_edit_ratio', 'history_turns'):
+                if key in result.get('metadata', {}):
+                    metadata[key] = result['metadata'][key]
+
+        if assistant.response_cache:
+            metadata['cache'] = assistant.response_cache.stats()
         metadata['success'] = True
 
         return ProcessedResponse(
@@ -354,6 +529,11 @@ async def process_text(
             metadata=metadata
         )
 
+    except InferenceQueueFull as e:
+        logging.warning(f"Rejected text processing for {user_id}: {str(e)}")
+        raise HTTPException(status_code=429, detail="Server is busy, please retry shortly")
+    except HTTPException:
+        raise
     except Exception as e:
         error_id = datetime.utcnow().strftime('%Y%m%d%H%M%S')
         logging.error(f"Error ID: {error_id}\nUnhandled error: {str(e)}", exc_info=True)
@@ -379,10 +559,75 @@ async def process_text(
             )
 
     
+@app.post("/process_text/stream")
+async def process_text_stream(
+    user_input: UserInput,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Server-sent events variant of /process_text
+
+    Emits a `correction` event as soon as grammar correction finishes, then `token`
+    events while the response is generated, and a final `done` event.
+    """
+    if not user_input.text.strip():
+        raise HTTPException(status_code=400, detail="Text input cannot be empty")
+
+    user_id = await extract_user_id_from_token(authorization) or user_input.user_id or "anonymous"
+    start_time = datetime.utcnow()
+    metadata = {
+        'processed_timestamp': start_time.isoformat(),
+        'firebase_available': firebase_available,
+        'streamed': True
+    }
+    language, proficiency, target = await resolve_user_preferences(user_id, user_input, metadata)
+
+    if language not in assistant.language_configs or not await assistant.check_language_models(language):
+        raise HTTPException(status_code=503, detail="Models for this language are unavailable")
+
+    try:
+        correction = await assistant.correct_grammar(user_input.text, language, target)
+    except InferenceQueueFull:
+        raise HTTPException(status_code=429, detail="Server is busy, please retry shortly")
+    corrected_text = correction or user_input.text
+    # Anonymous requests share no history
+    session = await assistant.conversation_session(user_id, language, proficiency, target) if user_id != "anonymous" else None
+    history = session.history.token_ids() if session else ()
+
+    async def events():
+        yield sse_event("correction", {"original_text": user_input.text, "corrected_text": corrected_text})
+        pieces = []
+        try:
+            async for piece in assistant.stream_response(corrected_text, language, proficiency, history):
+                if not pieces:
+                    metadata['time_to_first_token_ms'] = int((datetime.utcnow() - start_time).total_seconds() * 1000)
+                pieces.append(piece)
+                yield sse_event("token", {"text": piece})
+        except InferenceQueueFull:
+            yield sse_event("error", {"detail": "Server is busy, please retry shortly"})
+            return
+        except Exception as e:
+            logging.error(f"Streaming error for {user_id}: {str(e)}", exc_info=True)
+            yield sse_event("error", {"detail": "I'm having trouble processing your text right now."})
+            return
+
+        response = "".join(pieces).strip()
+        if session:
+            await assistant.remember_exchange(user_id, session, language, corrected_text, response)
+            metadata['history_turns'] = len(history)
+        metadata['processing_time_ms'] = int((datetime.utcnow() - start_time).total_seconds() * 1000)
+        metadata['success'] = True
+        yield sse_event("done", {"response": response, "metadata": metadata})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/speech-to-text")
-async def speech_to_text(audio: UploadFile = File(...), authorization: Optional[str] = Header(None)):
+async def speech_to_text(audio: UploadFile = File(...), words: bool = False, authorization: Optional[str] = Header(None)):
     request_id = f"stt-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
-    temp_paths = []
 
     try:
         # Get user ID and language preference
@@ -390,10 +635,9 @@ async def speech_to_text(audio: UploadFile = File(...), authorization: Optional[
         language = "fr"  # Default language
         
         # Try to get user's language preference from Firebase
-        if firebase_available and user_id != "anonymous":
+        if profiles_available() and user_id != "anonymous":
             try:
-                user_ref = db.reference(f'users/{user_id}/model_data')
-                user_data = await asyncio.get_event_loop().run_in_executor(None, lambda: user_ref.get() or {})
+                user_data = await profile_cache.get(user_id)
                 if user_data and 'lang_to_learn' in user_data:
                     language = user_data['lang_to_learn']
                     logging.info(f"[{request_id}] Using user language preference: {language}")
@@ -404,53 +648,176 @@ async def speech_to_text(audio: UploadFile = File(...), authorization: Optional[
         if language not in ["en", "fr"]:
             language = "en"  # Default to English for unrecognized languages
         
-        # Save and convert audio
-        temp_input_path = os.path.join(tempfile.gettempdir(), f"input_{request_id}")
-        temp_wav_path = temp_input_path + ".wav"
-        temp_paths = [temp_input_path, temp_wav_path]
-        
-        with open(temp_input_path, "wb") as buffer:
-            buffer.write(await audio.read())
-        
-        AudioSegment.from_file(temp_input_path).set_frame_rate(16000).set_channels(1).set_sample_width(2).export(temp_wav_path, format="wav")
-
-        # Process audio with Vosk using the appropriate model
-        with wave.open(temp_wav_path, "rb") as wf:
-            if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != 16000:
-                return JSONResponse(status_code=400, content={"error": "Invalid WAV format", "request_id": request_id})
-
-            # Get the appropriate language model
-            model = get_vosk_model(language)
-            logging.info(f"[{request_id}] Using {language} Vosk model for speech recognition")
-            
-            recognizer = KaldiRecognizer(model, 16000)
-            while True:
-                data = wf.readframes(4000)
-                if len(data) == 0:
-                    break
-                recognizer.AcceptWaveform(data)
-
-            final_text = json.loads(recognizer.FinalResult()).get("text", "")
-            return JSONResponse(
-                status_code=200, 
-                content={
-                    "text": final_text, 
-                    "language": language,
-                    "request_id": request_id
-                }
+        # Decode the upload in memory straight to 16 kHz mono s16le PCM
+        audio_bytes = await audio.read()
+        try:
+            pcm = await asyncio.get_event_loop().run_in_executor(None, decode_to_pcm, audio_bytes)
+        except AudioDecodeError as e:
+            logging.warning(f"[{request_id}] Could not decode audio: {str(e)}")
+            return JSONResponse(status_code=400, content={"error": "Invalid audio format", "request_id": request_id})
+
+        # Drop silence and split at pauses so only speech is decoded, segments in parallel
+        vad_result = await asyncio.get_event_loop().run_in_executor(None, vad.split, pcm)
+        logging.info(
+            f"[{request_id}] Using {language} Vosk model for speech recognition, "
+            f"{len(vad_result.segments)} segments, speech ratio {vad_result.speech_ratio}, "
+            f"{vad_result.bytes_saved} bytes skipped"
+        )
+        content = {"language": language, "request_id": request_id, "vad": vad_result.summary()}
+        if words:
+            # Per-word timings as parallel arrays: {"word": [...], "start": [...], "end": [...], "conf": [...]}
+            content["text"], content["words"] = await speech.transcribe_segments_words(
+                language, vad_result.segments, vad_result.offsets
             )
+        else:
+            content["text"] = await speech.transcribe_segments(language, vad_result.segments)
+        return JSONResponse(status_code=200, content=content)
 
     except Exception as e:
         logging.error(f"[{request_id}] Error: {str(e)}")
         return JSONResponse(status_code=500, content={"error": str(e), "request_id": request_id})
 
+@app.post("/speech-to-text/batch")
+async def speech_to_text_batch(
+    files: List[UploadFile] = File(...),
+    language: str = "en",
+    words: bool = False,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Transcribe many recordings in one request, streaming one JSON line per file
+
+    Files are decoded in parallel across the recognizer pool and results are sent
+    as each one completes. Recordings whose content was transcribed before are
+    answered from the transcript cache without decoding.
+    """
+    if language not in ["en", "fr"]:
+        raise HTTPException(status_code=400, detail="language must be 'en' or 'fr'")
+
+    user_id = await extract_user_id_from_token(authorization) or "anonymous"
+    logging.info(f"Batch transcription of {len(files)} files in {language} for {user_id}")
+    sources = [(upload.filename or f"file-{index}", upload.read) for index, upload in enumerate(files)]
+
+    async def lines():
+        async for result in batch_transcriber.run(sources, language, words=words):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.websocket("/ws/speech-to-text")
+async def speech_to_text_stream(websocket: WebSocket, language: Optional[str] = None, format: str = "pcm", token: Optional[str] = None):
+    """
+    Real-time speech recognition over a WebSocket
+
+    The client sends binary audio chunks while the user speaks: raw 16 kHz mono
+    s16le PCM (format=pcm) or an encoded stream such as Opus in WebM/OGG
+    (format=opus, decoded on the fly by ffmpeg), then the text message "EOF".
+    The server answers with {"type": "partial"} updates, a {"type": "result"}
+    for every utterance Vosk endpoints, and a closing {"type": "final"} transcript.
+    """
+    await websocket.accept()
+    request_id = f"ws-stt-{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}"
+    loop = asyncio.get_event_loop()
+    decoder = None
+    decoded = None
+    # AcceptWaveform call running on the default executor, if any
+    accepting = None
+    resources = ExitStack()
+
+    try:
+        user_id = await extract_user_id_from_token(f"Bearer {token}" if token else None) or "anonymous"
+        if language is None and profiles_available() and user_id != "anonymous":
+            try:
+                language = (await profile_cache.get(user_id)).get('lang_to_learn')
+            except Exception as e:
+                logging.warning(f"[{request_id}] Failed to fetch user language preference: {str(e)}")
+        if language not in ["en", "fr"]:
+            language = "en"
+
+        # Streaming recognizers close an utterance after a short trailing silence
+        recognizer = resources.enter_context(speech.streaming_pool.acquire(language))
+        if format != "pcm":
+            decoder = StreamingDecoder(loop)
+        logging.info(f"[{request_id}] Streaming {format} recognition with {language} model")
+
+        segments = []
+        last_partial = ""
+
+        async def recognize(pcm: bytes):
+            nonlocal last_partial, accepting
+            accepting = loop.run_in_executor(None, recognizer.AcceptWaveform, pcm)
+            # Shielded so a cancelled caller leaves the future to finish, see the finally below
+            if await asyncio.shield(accepting):
+                text = json.loads(recognizer.Result()).get("text", "")
+                last_partial = ""
+                if text:
+                    segments.append(text)
+                    await websocket.send_json({"type": "result", "text": text})
+            else:
+                partial = json.loads(recognizer.PartialResult()).get("partial", "")
+                if partial != last_partial:
+                    last_partial = partial
+                    await websocket.send_json({"type": "partial", "text": partial})
+
+        async def recognize_decoded():
+            while True:
+                pcm = await decoder.read()
+                if not pcm:
+                    return
+                await recognize(pcm)
+
+        decoded = asyncio.ensure_future(recognize_decoded()) if decoder else None
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                if decoder:
+                    await decoder.feed(message["bytes"])
+                else:
+                    await recognize(message["bytes"])
+            elif (message.get("text") or "").strip().upper() == "EOF":
+                break
+
+        if decoder:
+            await decoder.close_input()
+            await decoded
+
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if text:
+            segments.append(text)
+        await websocket.send_json({
+            "type": "final",
+            "text": " ".join(segments),
+            "language": language,
+            "request_id": request_id
+        })
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        logging.info(f"[{request_id}] Client disconnected")
+    except Exception as e:
+        logging.error(f"[{request_id}] Error: {str(e)}")
+        try:
+            await websocket.send_json({"type": "error", "error": str(e), "request_id": request_id})
+            await websocket.close(code=1011)
+        except Exception:
+            pass
     finally:
-        for path in temp_paths:
-            if path and os.path.exists(path):
-                try:
-                    os.remove(path)
-                except Exception:
-                    pass
+        if decoded and not decoded.done():
+            decoded.cancel()
+        if decoder:
+            decoder.kill()
+        if accepting is not None and not accepting.done():
+            # The executor thread may still be inside AcceptWaveform; KaldiRecognizer is not
+            # thread-safe, so it must finish before the recognizer is Reset() and pooled
+            try:
+                await asyncio.wait({accepting})
+            except asyncio.CancelledError:
+                # Cannot wait: keep the recognizer out of the pool rather than share it
+                resources.pop_all()
+                raise
+        resources.close()
 
 @app.get("/health")
 async def health_check():
@@ -461,6 +828,43 @@ async def health_check():
         "firebase_available": firebase_available
     }
 
+@app.get("/ready")
+async def readiness_check():
+    readiness = assistant.readiness()
+    readiness["speech"] = dict(speech.prewarm_status)
+    readiness["ready"] = readiness["ready"] and speech.prewarm_status["state"] == "ready"
+    readiness["timestamp"] = str(datetime.now())
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "timestamp": str(datetime.now()),
+        "grammar_batching": assistant.grammar_batcher.stats(),
+        "generation_policy": {
+            "grammar": assistant.grammar_policy.stats(),
+            "response": assistant.response_policy.stats()
+        },
+        "inference": assistant.inference_executor.stats(),
+        "models": assistant.model_registry.stats(),
+        "response_cache": assistant.response_cache.stats() if assistant.response_cache else None,
+        "greeting_pool": assistant.greeting_pool.stats(),
+        "profile_cache": profile_cache.stats(),
+        "sessions": session_store.stats(),
+        "speech": speech.stats(),
+        "vad": vad.stats(),
+        "batch_transcription": batch_transcriber.stats(),
+        "translation": translation_service.stats()
+    }
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    profile_cache.stop_listening()
+    speech.shutdown()
+    await assistant.greeting_pool.stop()
+    assistant.inference_executor.shutdown()
+    await translation_service.close()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,25 +1,53 @@
 import torch
-from firebase_admin import db
 from transformers import (
     AutoTokenizer,
     BlenderbotTokenizer,
     BlenderbotForConditionalGeneration,
     AutoModelForCausalLM,
-    AutoModelForSeq2SeqLM,
-    pipeline
+    AutoModelForSeq2SeqLM
 )
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Sequence, Tuple
 import os
 import asyncio
 from datetime import datetime
 import logging
 import random
+import time
+from config import get_settings
+from src.batching import MicroBatcher
+from src.inference_executor import InferenceExecutor, InferenceQueueFull
+from src.model_registry import ModelRegistry
+from src.response_cache import ResponseCache, normalize_text
+from src.greeting_pool import GreetingPool
+from src.streaming import AsyncTextStreamer
+from src.profile_cache import UserProfileCache
+from src.session_store import InMemorySessionStore, SessionRecord, SessionStore
+from src.conversation import build_input_ids
+from src.generation_policy import GenerationPolicy
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def word_edit_ratio(original: str, corrected: str) -> float:
+    """
+    Word-level Levenshtein distance between two texts, normalized by the longer one
+    """
+    a, b = original.lower().split(), corrected.lower().split()
+    if not a and not b:
+        return 0.0
+    previous = list(range(len(b) + 1))
+    for i, word in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other)))
+        previous = current
+    return previous[-1] / max(len(a), len(b))
+
 class MultilingualAssistant:
-    def __init__(self):
+    RESPONSE_FALLBACK = "I'm having trouble understanding. Could you rephrase that?"
+
+    def __init__(self, profile_cache: Optional[UserProfileCache] = None, session_store: Optional[SessionStore] = None):
+        self.profile_cache = profile_cache
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         logger.info(f"Using device: {self.device}")
         
@@ -98,32 +126,111 @@ class MultilingualAssistant:
             }
         }
         
+        settings = get_settings()
+        # Languages share checkpoints, so models are loaded once through the registry
+        self.model_registry = ModelRegistry(
+            self.device,
+            backend=settings.inference_backend,
+            cache_dir=settings.model_cache_dir
+        )
         self.models = {'fr': {}, "en": {}}
-        self.is_loading = {'fr': False, "en": False}
-        self.load_lock = asyncio.Lock()
-        self.user_sessions = {}
-        
-        # Pre-load English models at initialization
-        # asyncio.create_task(self.load_language_models("en"))
+        # One lock per language so different languages load in parallel
+        self.load_locks = {language: asyncio.Lock() for language in self.language_configs}
+        self.model_status = {language: {'state': 'not_loaded'} for language in self.language_configs}
+        # Bounded session storage; a shared backend makes sessions visible to every worker
+        self.session_store = session_store or InMemorySessionStore(
+            max_entries=settings.session_max_entries,
+            idle_ttl_seconds=settings.session_idle_ttl_seconds
+        )
+        # Token budget of the conversation history fed to the chat model, 0 disables history
+        self.conversation_max_tokens = settings.conversation_max_tokens
+
+        self.greeting_prompts = {
+            "en": [
+                "Hello! How are you doing today?",
+                "Hey there, a wonderful day, is it not?",
+                "Greetings! Ready to practice some language skills?",
+                "Welcome! I'm here to help you learn and improve."
+            ],
+            'fr': [
+                "Bonjour! Comment allez-vous aujourd'hui?",
+                "Salut! Prêt à pratiquer votre français?",
+                "Bienvenue! Je suis là pour vous aider à apprendre.",
+                "Bonjour! C'est un plaisir de vous aider avec votre français."
+            ]
+        }
+
+        # Cached outputs are only valid if decoding is deterministic, so sampling disables the cache
+        self.deterministic_decoding = settings.deterministic_decoding
+        # Beam width and length budget per input-length bucket, narrowed when generate() misses the SLO
+        self.grammar_policy = GenerationPolicy(
+            "grammar",
+            max_beams=settings.grammar_max_beams,
+            latency_slo_ms=settings.generation_latency_slo_ms,
+            length_ratio=1.5,
+            min_new_tokens=16,
+            max_new_tokens=512
+        )
+        # Replies get the proficiency's max_length whatever the message length; beam search
+        # stops at EOS, so short replies do not pay for the larger budget
+        self.response_policy = GenerationPolicy(
+            "response",
+            max_beams=settings.response_max_beams,
+            latency_slo_ms=settings.generation_latency_slo_ms,
+            max_new_tokens=512
+        )
+        self.response_cache = ResponseCache(
+            max_entries=settings.response_cache_max_entries,
+            ttl_seconds=settings.response_cache_ttl_seconds,
+            db_path=settings.response_cache_path or None
+        ) if settings.response_cache_enabled and self.deterministic_decoding else None
+
+        # All blocking model calls run here so they never stall the event loop
+        self.inference_executor = InferenceExecutor(
+            max_workers=settings.inference_workers,
+            max_queue_depth=settings.inference_queue_depth,
+            intra_op_threads=settings.torch_intra_op_threads
+        )
+        # Concurrent grammar corrections for the same (language, target) share one generate call
+        self.grammar_batcher = MicroBatcher(
+            self._correct_grammar_batch,
+            max_batch_size=settings.grammar_batch_max_size,
+            window_ms=settings.grammar_batch_window_ms,
+            name="grammar_batcher",
+            runner=self.inference_executor.run
+        )
+        # Session greetings are generated ahead of time and served from a pool
+        self.greeting_pool = GreetingPool(
+            self.generate_greeting,
+            pool_size=settings.greeting_pool_size,
+            max_age_seconds=settings.greeting_max_age_seconds,
+            refresh_interval_seconds=settings.greeting_refresh_interval_seconds
+        )
+
+        # Opt-in: overlap response generation with grammar correction, see process_input()
+        self.speculative_response = settings.speculative_response
+        self.speculative_max_edit_ratio = settings.speculative_max_edit_ratio
+
+        # Models for these languages are loaded and warmed up at startup, see warm_up()
+        self.preload_languages = [
+            language.strip() for language in settings.preload_languages.split(",")
+            if language.strip() in self.language_configs
+        ]
 
     async def initialize_user_session(self, user_id: str, language: str = "en", proficiency: str = 'intermediate', target: str = 'grammar_correction') -> Dict[str, Any]:
         try:
             logger.info(f"Session initialization request for user {user_id}")
-            # Fetch user preferences from Firebase
-            user_ref = db.reference(f'users/{user_id}/model_data')
-            try:
-                user_data = await asyncio.wait_for(
-                    asyncio.get_event_loop().run_in_executor(None, user_ref.get),
-                    timeout=5.0
-                ) or {}
-                logger.info(f"Retrieved user data for {user_id}: {user_data}")
-            except asyncio.TimeoutError:
-                logger.warning(f"Firebase timeout for user {user_id}")
-                user_data = {}
-            except Exception as firebase_error:
-                logger.error(f"Firebase error for user {user_id}: {str(firebase_error)}")
-                # Use empty user data instead of raising error
-                user_data = {}
+            # Fetch user preferences; usually a cache hit since the API layer just read them
+            user_data = {}
+            if self.profile_cache is not None:
+                try:
+                    user_data = await self.profile_cache.get(user_id)
+                    logger.info(f"Retrieved user data for {user_id}: {user_data}")
+                except asyncio.TimeoutError:
+                    logger.warning(f"Profile lookup timeout for user {user_id}")
+                except Exception as profile_error:
+                    # Use empty user data instead of raising error
+                    logger.error(f"Profile lookup error for user {user_id}: {str(profile_error)}")
                 
             # Use provided values or fallback to defaults
             language = user_data.get('lang_to_learn', language)
@@ -134,35 +241,14 @@ class MultilingualAssistant:
             await self.load_language_models(language)
             
             # Store user-specific session configuration
-            self.user_sessions[user_id] = {
-                'language': language,
-                'proficiency': proficiency,
-                'target': target,
-                'last_interaction': datetime.now()
-            }
+            await self.session_store.put(user_id, SessionRecord(language, proficiency, target))
             
-            # Generate a welcoming, contextual greeting
-            greeting_prompts = {
-                "en": [
-                    "Hello! How are you doing today?",
-                    "Hey there, a wonderful day, is it not?",
-                    "Greetings! Ready to practice some language skills?",
-                    "Welcome! I'm here to help you learn and improve."
-                ],
-                'fr': [
-                    "Bonjour! Comment allez-vous aujourd'hui?",
-                    "Salut! Prêt à pratiquer votre français?",
-                    "Bienvenue! Je suis là pour vous aider à apprendre.",
-                    "Bonjour! C'est un plaisir de vous aider avec votre français."
-                ]
-            }
-            
-            # Generate greeting using response generation method
-            greeting = await self.generate_response(
-                random.choice(greeting_prompts.get(language, greeting_prompts["en"])), 
-                language, 
-                proficiency
-            )
+            # Serve a pre-generated greeting; fall back to a plain prompt while the pool fills
+            greeting = None
+            if proficiency in self.model_configs:
+                greeting = self.greeting_pool.take(language, proficiency)
+            if greeting is None:
+                greeting = random.choice(self.greeting_prompts.get(language, self.greeting_prompts["en"]))
             
             return {
                 "user_id": user_id,
@@ -173,6 +259,8 @@ class MultilingualAssistant:
                 "initialized": True
             }
         
+        except InferenceQueueFull:
+            raise
         except Exception as e:
             logger.error(f"User session initialization error: {e}")
             return {
@@ -182,45 +270,141 @@ class MultilingualAssistant:
             }
 
     async def load_language_models(self, language: str):
-        async with self.load_lock:
-            if language not in self.models or not self.models[language]:
-                if self.is_loading[language]:
-                    while self.is_loading[language]:
-                        await asyncio.sleep(0.1)
-                    return
-                
-                self.is_loading[language] = True
-                config = self.language_configs[language]
-                
-                try:
-                    logger.info(f"Loading models for {language}")
-                    
-                    # Load models with pipeline for optimization
-                    self.models[language] = {
-                        'grammar': pipeline(
-                            "text2text-generation",
-                            model=config['grammar_model'],
-                            device=0 if torch.cuda.is_available() else -1
-                        ),
-                        'grammar_tokenizer': AutoTokenizer.from_pretrained(config['grammar_model']),
-                        'grammar_model': AutoModelForSeq2SeqLM.from_pretrained(config['grammar_model']).to(self.device),
-                        'chat_tokenizer': config['tokenizer_class'].from_pretrained(config['chat_model']),
-                        'chat_model': config['model_class'].from_pretrained(config['chat_model']).to(self.device),
-                        'response': pipeline(
-                            "text2text-generation",
-                            model=config['chat_model'],
-                            device=0 if torch.cuda.is_available() else -1
-                        )
-                    }
-                    
-                    logger.info(f"Successfully loaded models for {language}")
-                except Exception as e:
-                    logger.error(f"Error loading models for {language}: {e}")
-                    raise
-                finally:
-                    self.is_loading[language] = False
-
-    async def process_input(self, text: str, language: str, proficiency: str, target: str) -> Dict[str, Any]:
+        async with self.load_locks[language]:
+            if self.models.get(language):
+                return
+
+            config = self.language_configs[language]
+            status = self.model_status[language]
+            status.update(state='loading', error=None)
+            started = datetime.now()
+
+            try:
+                logger.info(f"Loading models for {language}")
+                models = await self._load_models(config)
+                status['load_ms'] = int((datetime.now() - started).total_seconds() * 1000)
+
+                # A first generate allocates buffers so the first real request is not slower
+                status['state'] = 'warming_up'
+                warmup_started = datetime.now()
+                await self.inference_executor.run(self._warm_up_sync, language, models)
+                status['warmup_ms'] = int((datetime.now() - warmup_started).total_seconds() * 1000)
+
+                self.models[language] = models
+                status.update(state='ready', ready_at=datetime.now().isoformat())
+                logger.info(f"Successfully loaded models for {language} in {status['load_ms']} ms (warm-up {status['warmup_ms']} ms)")
+                self.greeting_pool.schedule_fill_all(language, self.model_configs)
+            except Exception as e:
+                status.update(state='failed', error=str(e))
+                logger.error(f"Error loading models for {language}: {e}")
+                raise
+
+    async def _load_models(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        # from_pretrained is slow and blocking: load both checkpoints in parallel worker threads
+        loop = asyncio.get_event_loop()
+        grammar, chat = await asyncio.gather(
+            loop.run_in_executor(
+                None, self.model_registry.acquire, config['grammar_model'], AutoModelForSeq2SeqLM, AutoTokenizer
+            ),
+            loop.run_in_executor(
+                None, self.model_registry.acquire, config['chat_model'], config['model_class'], config['tokenizer_class']
+            ),
+            return_exceptions=True
+        )
+        errors = [result for result in (grammar, chat) if isinstance(result, BaseException)]
+        if errors:
+            for checkpoint, result in ((config['grammar_model'], grammar), (config['chat_model'], chat)):
+                if not isinstance(result, BaseException):
+                    self.model_registry.release(checkpoint)
+            raise errors[0]
+
+        return {
+            'grammar_tokenizer': grammar.tokenizer,
+            'grammar_model': grammar.model,
+            'chat_tokenizer': chat.tokenizer,
+            'chat_model': chat.model
+        }
+
+    def _warm_up_sync(self, language: str, models: Dict[str, Any]):
+        with torch.no_grad():
+            grammar_inputs = models['grammar_tokenizer'](
+                [f"{self.target_uses[language]['grammar_correction']['prompt']}this are a test"],
+                return_tensors="pt"
+            ).to(self.device)
+            models['grammar_model'].generate(**grammar_inputs, max_length=8, num_beams=1)
+            chat_inputs = models['chat_tokenizer'](["Hello"], return_tensors="pt").to(self.device)
+            models['chat_model'].generate(**chat_inputs, max_length=8, num_beams=1)
+
+    async def warm_up(self, languages: Optional[List[str]] = None):
+        """
+        Load and warm up models for several languages concurrently
+
+        Failures are recorded in model_status instead of being raised.
+        """
+        languages = self.preload_languages if languages is None else languages
+        await asyncio.gather(
+            *(self.load_language_models(language) for language in languages),
+            return_exceptions=True
+        )
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Report whether every preloaded language is ready, with per-language load state
+        """
+        return {
+            "ready": all(self.model_status[language]['state'] == 'ready' for language in self.preload_languages),
+            "languages": {language: dict(status) for language, status in self.model_status.items()},
+            "checkpoints": self.model_registry.stats()
+        }
+
+    async def unload_language_models(self, language: str):
+        """
+        Release a language's models, freeing checkpoints no other language still uses
+        """
+        async with self.load_locks[language]:
+            if not self.models.get(language):
+                return
+            config = self.language_configs[language]
+            self.models[language] = {}
+            self.model_status[language] = {'state': 'not_loaded'}
+            self.model_registry.release(config['grammar_model'])
+            self.model_registry.release(config['chat_model'])
+            logger.info(f"Unloaded models for {language}")
+
+    async def conversation_session(self, user_id: str, language: str, proficiency: str, target: str) -> Optional[SessionRecord]:
+        """
+        The user's session with its conversation history, created if missing
+
+        History tokenized for another chat model is dropped, since its ids mean
+        nothing to the current tokenizer.
+
+        Returns:
+            The session, or None when conversation history is disabled
+        """
+        if self.conversation_max_tokens <= 0:
+            return None
+        session = await self.session_store.get(user_id)
+        if session is None:
+            session = SessionRecord(language, proficiency, target)
+        checkpoint = self.language_configs[language]['chat_model']
+        if session.history.checkpoint != checkpoint:
+            session.history.reset(checkpoint)
+        session.history.max_tokens = self.conversation_max_tokens
+        return session
+
+    async def remember_exchange(self, user_id: str, session: SessionRecord, language: str, user_text: str, response: str):
+        """
+        Append one user turn and the reply to the session history and store the session
+
+        Each turn is tokenized here, once; later requests only reuse the cached ids.
+        """
+        tokenizer = self.models[language]['chat_tokenizer']
+        for turn in (normalize_text(user_text), response.strip()):
+            if turn:
+                session.history.add(turn, tokenizer(f" {turn}", add_special_tokens=False)['input_ids'])
+        await self.session_store.put(user_id, session)
+
+    async def process_input(self, text: str, language: str, proficiency: str, target: str, speculative: Optional[bool] = None, user_id: Optional[str] = None) -> Dict[str, Any]:
         if not text.strip():
             return {
                 "original_text": text,
@@ -241,8 +425,22 @@ class MultilingualAssistant:
 
         # Process text
         try:
-            correction = await self.correct_grammar(text, language, target)
-            response = await self.generate_response(correction or text, language, proficiency)
+            session = await self.conversation_session(user_id, language, proficiency, target) if user_id else None
+            history = session.history.token_ids() if session else ()
+
+            if self.speculative_response if speculative is None else speculative:
+                correction, response, path_metadata = await self._process_speculatively(text, language, proficiency, target, history)
+            else:
+                correction = await self.correct_grammar(text, language, target)
+                response = await self._try_generate_response(correction or text, language, proficiency, history)
+                path_metadata = {"response_path": "sequential"}
+
+            if response is None:
+                # The apology is for the user only; it must not become conversation context
+                response = self.RESPONSE_FALLBACK
+            elif session:
+                await self.remember_exchange(user_id, session, language, correction or text, response)
+                path_metadata["history_turns"] = len(history)
             
             return {
                 "original_text": text,
@@ -252,9 +450,12 @@ class MultilingualAssistant:
                     "language": language,
                     "proficiency": proficiency,
                     "target": target,
-                    "processed_timestamp": str(datetime.now())
+                    "processed_timestamp": str(datetime.now()),
+                    **path_metadata
                 }
             }
+        except InferenceQueueFull:
+            raise
         except Exception as e:
             logger.error(f"Processing error: {e}")
             return {
@@ -264,55 +465,104 @@ class MultilingualAssistant:
                 "metadata": {"error": str(e)}
             }
 
+    async def _process_speculatively(self, text: str, language: str, proficiency: str, target: str, history: Sequence[Sequence[int]] = ()):
+        """
+        Generate the response from the raw text while grammar correction runs
+
+        The speculative response is kept when the correction is a no-op or a minor
+        edit (word edit ratio within speculative_max_edit_ratio); otherwise the
+        response is regenerated from the corrected text.
+        """
+        correction_task = asyncio.ensure_future(self.correct_grammar(text, language, target))
+        speculative_task = asyncio.ensure_future(self._try_generate_response(text, language, proficiency, history))
+        try:
+            correction = await correction_task
+            edit_ratio = word_edit_ratio(text, correction) if correction else 0.0
+
+            if edit_ratio <= self.speculative_max_edit_ratio:
+                response = await speculative_task
+                path = "speculative_kept"
+            else:
+                speculative_task.cancel()
+                response = await self._try_generate_response(correction, language, proficiency, history)
+                path = "speculative_regenerated"
+        finally:
+            for task in (correction_task, speculative_task):
+                if not task.done():
+                    task.cancel()
+
+        return correction, response, {"response_path": path, "correction_edit_ratio": round(edit_ratio, 3)}
+
     async def correct_grammar(self, input_text: str, language: str, target: str) -> Optional[str]:
         if len(input_text.split()) <= 1:
             return None
 
         try:
             target_config = self.target_uses[language][target]
-            grammar_input = f"{target_config['prompt']}{input_text}"
-            
-            # Try using the pipeline first (faster)
-            try:
-                result = self.models[language]['grammar'](
-                    grammar_input,
-                    max_length=min(512, len(input_text.split()) * 2),
-                    num_beams=5,
-                    do_sample=True,
-                    temperature=target_config['weight']
+            text = normalize_text(input_text)
+            grammar_input = f"{target_config['prompt']}{text}"
+
+            cache_key = None
+            corrected = None
+            if self.response_cache:
+                cache_key = ResponseCache.make_key(
+                    self.language_configs[language]['grammar_model'],
+                    target_config['prompt'],
+                    text,
+                    {**self.grammar_policy.describe(), 'repetition_penalty': 1.1}
                 )
-                corrected = result[0]['generated_text']
-            except:
-                # Fallback to traditional method if pipeline fails
-                models = self.models[language]
-                input_ids = models['grammar_tokenizer'](
-                    grammar_input,
-                    return_tensors="pt",
-                    padding=True,
-                    truncation=True,
-                    max_length=512
-                ).input_ids.to(self.device)
-                
-                with torch.no_grad():
-                    outputs = models['grammar_model'].generate(
-                        input_ids,
-                        max_length=min(512, len(input_text.split()) * 2),
-                        num_beams=5,
-                        do_sample=True,
-                        temperature=target_config['weight'],
-                        top_p=0.9,
-                        repetition_penalty=1.1,
-                        early_stopping=True
-                    )
-                
-                corrected = models['grammar_tokenizer'].decode(outputs[0], skip_special_tokens=True)
+                corrected = self.response_cache.get(cache_key)
+
+            if corrected is None:
+                corrected, full_width = await self.grammar_batcher.submit((language, target), grammar_input)
+                if cache_key and full_width:
+                    self.response_cache.put(cache_key, corrected)
             
-            return corrected if corrected.lower() != input_text.lower() else None
+            return corrected if corrected.lower() != text.lower() else None
 
+        except InferenceQueueFull:
+            raise
         except Exception as e:
             logger.error(f"Grammar correction error: {e}")
             return None
 
+    def _grammar_generation_params(self, target_config: Dict[str, Any], input_tokens: int) -> Dict[str, Any]:
+        temperature = None if self.deterministic_decoding else target_config['weight']
+        params = self.grammar_policy.params(input_tokens, temperature=temperature)
+        params['repetition_penalty'] = 1.1
+        return params
+
+    def _correct_grammar_batch(self, key, items) -> list:
+        """
+        Run one padded generate over a batch of grammar inputs sharing (language, target)
+
+        Returns:
+            (corrected text, decoded at full beam width) per input
+        """
+        language, target = key
+        target_config = self.target_uses[language][target]
+        models = self.models[language]
+
+        inputs = models['grammar_tokenizer'](
+            list(items),
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=512
+        ).to(self.device)
+        # Padded to the longest input, so the batch is budgeted (and timed) as that input
+        input_tokens = inputs['input_ids'].shape[1]
+        params = self._grammar_generation_params(target_config, input_tokens)
+
+        start = time.perf_counter()
+        with torch.no_grad():
+            outputs = models['grammar_model'].generate(**inputs, **params)
+        if not params.get('do_sample'):
+            self.grammar_policy.record(input_tokens, (time.perf_counter() - start) * 1000, params['num_beams'])
+
+        full_width = self.grammar_policy.at_full_width(params)
+        return [(corrected, full_width) for corrected in models['grammar_tokenizer'].batch_decode(outputs, skip_special_tokens=True)]
+
     async def check_language_models(self, language: str) -> bool:
         """
         Check if language models are available or can be loaded
@@ -340,47 +590,197 @@ class MultilingualAssistant:
             logger.error(f"Error checking language models: {e}")
             return False
 
-    async def generate_response(self, input_text: str, language: str, proficiency: str) -> str:
+    async def generate_response(self, input_text: str, language: str, proficiency: str, history: Sequence[Sequence[int]] = ()) -> str:
+        """
+        Args:
+            history: Token ids of earlier turns, oldest first, see ConversationBuffer.token_ids()
+
+        Returns:
+            The response, or a fixed apology if generation failed
+        """
+        response = await self._try_generate_response(input_text, language, proficiency, history)
+        return response if response is not None else self.RESPONSE_FALLBACK
+
+    async def _try_generate_response(self, input_text: str, language: str, proficiency: str, history: Sequence[Sequence[int]] = ()) -> Optional[str]:
+        """
+        generate_response() returning None on failure, so callers can tell the fallback from a real reply
+        """
         try:
             config = self.model_configs[proficiency]
             context = random.choice(config['context_prompts'][language])
-            modified_input = f"{context}{input_text}"
-            
-            # Try using the pipeline first (faster)
-            try:
-                result = self.models[language]['response'](
-                    modified_input,
-                    max_length=config['max_length'],
-                    num_beams=4,
-                    do_sample=True,
-                    temperature=config['complexity']
-                )
-                return result[0]['generated_text']
-            except:
-                # Fallback to traditional method if pipeline fails
-                models = self.models[language]
-                input_data = models['chat_tokenizer'](
-                    modified_input,
-                    return_tensors="pt",
-                    padding=True,
-                    truncation=True,
-                    max_length=512
-                ).to(self.device)
-                
-                with torch.no_grad():
-                    output_ids = models['chat_model'].generate(
-                        **input_data,
-                        max_length=config['max_length'],
-                        num_beams=4,
-                        do_sample=True,
-                        temperature=config['complexity'],
-                        top_p=0.9,
-                        repetition_penalty=1.2,
-                        early_stopping=True
-                    )
-                
-                return models['chat_tokenizer'].decode(output_ids[0], skip_special_tokens=True)
+            text = normalize_text(input_text)
+            modified_input = f"{context}{text}"
 
+            cache_key = None
+            if self.response_cache:
+                cache_key = self._response_cache_key(language, context, text, self._response_cache_params(config), history)
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+            response, full_width = await self.inference_executor.run(
+                self._generate_response_sync, modified_input, language, config, False, history
+            )
+            # Responses narrowed for latency are not cached, so they are not served off-peak
+            if cache_key and full_width:
+                self.response_cache.put(cache_key, response)
+            return response
+
+        except InferenceQueueFull:
+            raise
         except Exception as e:
             logger.error(f"Response generation error: {e}")
-            return "I'm having trouble understanding. Could you rephrase that?"
\ No newline at end of file
+            return None
+
+    async def stream_response(self, input_text: str, language: str, proficiency: str, history: Sequence[Sequence[int]] = ()) -> AsyncIterator[str]:
+        """
+        Yield the chat response piece by piece as generate() produces tokens
+
+        Streaming decodes with a single beam, since beam search only knows its best
+        sequence at the end. Closing the generator stops the underlying generate().
+        """
+        config = self.model_configs[proficiency]
+        context = random.choice(config['context_prompts'][language])
+        text = normalize_text(input_text)
+
+        cache_key = None
+        if self.response_cache:
+            cache_key = self._response_cache_key(
+                language, context, text, self._response_cache_params(config, streamed=True), history
+            )
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        models = self.models[language]
+        streamer = AsyncTextStreamer(models['chat_tokenizer'], asyncio.get_running_loop(), skip_special_tokens=True)
+        generation = asyncio.ensure_future(self.inference_executor.run(
+            self._stream_generate_sync, f"{context}{text}", language, config, streamer, history
+        ))
+        generation.add_done_callback(lambda _: streamer.finish())
+
+        pieces = []
+        try:
+            async for piece in streamer:
+                pieces.append(piece)
+                yield piece
+            await generation
+        finally:
+            if not generation.done():
+                streamer.cancel()
+                generation.cancel()
+
+        if cache_key:
+            self.response_cache.put(cache_key, "".join(pieces).strip())
+
+    def _response_cache_params(self, config: Dict[str, Any], streamed: bool = False) -> Dict[str, Any]:
+        # Streamed responses are decoded greedily, so they are cached apart from beam-searched ones
+        return {
+            **self.response_policy.describe(),
+            'max_length': config['max_length'],
+            'repetition_penalty': 1.2,
+            'streamed': streamed
+        }
+
+    def _response_cache_key(self, language: str, context: str, text: str, params: Dict[str, Any], history: Sequence[Sequence[int]]) -> str:
+        parts = [self.language_configs[language]['chat_model'], context, text, params]
+        # Without history the key stays what it was, so existing cache entries remain valid
+        if history:
+            parts.append([list(ids) for ids in history])
+        return ResponseCache.make_key(*parts)
+
+    def _chat_inputs(self, modified_input: str, language: str, history: Sequence[Sequence[int]] = ()) -> Dict[str, Any]:
+        """
+        Encoder inputs for the chat model: the current turn, preceded by as much history as fits
+
+        BlenderBot's encoder attends bidirectionally, so its outputs for earlier turns
+        change whenever a turn is appended and cannot be carried over between requests.
+        The cost is kept bounded instead: history turns are never re-tokenized, and the
+        whole input stays within the encoder window.
+        """
+        tokenizer = self.models[language]['chat_tokenizer']
+        if not history:
+            return tokenizer(
+                modified_input,
+                return_tensors="pt",
+                truncation=True,
+                max_length=512
+            ).to(self.device)
+
+        current = tokenizer(modified_input, add_special_tokens=False)['input_ids']
+        window = min(512, tokenizer.model_max_length)
+        input_ids = build_input_ids(
+            history,
+            current,
+            budget=min(window, len(current) + 1 + self.conversation_max_tokens),
+            separator=tokenizer(" ", add_special_tokens=False)['input_ids'],
+            eos_token_id=tokenizer.eos_token_id
+        )
+        input_ids = torch.tensor([input_ids], device=self.device)
+        return {'input_ids': input_ids, 'attention_mask': torch.ones_like(input_ids)}
+
+    def _stream_generate_sync(self, modified_input: str, language: str, config: Dict[str, Any], streamer: AsyncTextStreamer, history: Sequence[Sequence[int]] = ()):
+        models = self.models[language]
+        input_data = self._chat_inputs(modified_input, language, history)
+        params = self._response_generation_params(config, input_data['input_ids'].shape[1])
+        params.update(num_beams=1)
+        params.pop('early_stopping', None)
+
+        with torch.no_grad():
+            models['chat_model'].generate(
+                **input_data,
+                **params,
+                streamer=streamer,
+                stopping_criteria=streamer.stopping_criteria()
+            )
+
+    async def generate_greeting(self, language: str, proficiency: str) -> str:
+        """
+        Generate one session greeting for the greeting pool
+
+        Greetings are always sampled and never cached, so the pool holds varied lines.
+        """
+        config = self.model_configs[proficiency]
+        context = random.choice(config['context_prompts'][language])
+        prompt = random.choice(self.greeting_prompts[language])
+        greeting, _ = await self.inference_executor.run(
+            self._generate_response_sync,
+            f"{context}{prompt}",
+            language,
+            config,
+            True
+        )
+        return greeting
+
+    def _response_generation_params(self, config: Dict[str, Any], input_tokens: int, sample: bool = False) -> Dict[str, Any]:
+        """
+        Decoding settings for a chat input of input_tokens tokens
+
+        The proficiency's max_length is the reply budget; sampling (greetings, or
+        non-deterministic decoding) uses the proficiency's complexity as temperature.
+        """
+        temperature = config['complexity'] if sample or not self.deterministic_decoding else None
+        params = self.response_policy.params(input_tokens, budget=config['max_length'], temperature=temperature)
+        params['repetition_penalty'] = 1.2
+        return params
+
+    def _generate_response_sync(self, modified_input: str, language: str, config: Dict[str, Any], sample: bool = False, history: Sequence[Sequence[int]] = ()) -> Tuple[str, bool]:
+        """
+        Returns:
+            The response, and whether it was decoded at the policy's full beam width
+        """
+        # Tokenized here rather than through a pipeline, since the input length picks the decoding settings
+        models = self.models[language]
+        input_data = self._chat_inputs(modified_input, language, history)
+        input_tokens = input_data['input_ids'].shape[1]
+        params = self._response_generation_params(config, input_tokens, sample)
+
+        start = time.perf_counter()
+        with torch.no_grad():
+            output_ids = models['chat_model'].generate(**input_data, **params)
+        if not params.get('do_sample'):
+            self.response_policy.record(input_tokens, (time.perf_counter() - start) * 1000, params['num_beams'])
+
+        response = models['chat_tokenizer'].decode(output_ids[0], skip_special_tokens=True)
+        return response, self.response_policy.at_full_width(params)
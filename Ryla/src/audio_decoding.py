@@ -0,0 +1,153 @@
+from shutil import which
+from typing import Iterator, List, Optional
+import asyncio
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+# 4000 frames of 16-bit mono audio, the chunk size Vosk has always been fed here
+CHUNK_BYTES = 8000
+
+FFMPEG_BINARY = which("ffmpeg") or r"..\\..\\FFmpeg\\bin\\ffmpeg.exe"
+
+
+class AudioDecodeError(Exception):
+    """
+    Raised when ffmpeg cannot decode an uploaded recording
+    """
+
+
+def _ffmpeg_command(source: str, ffmpeg: str, sample_rate: int) -> List[str]:
+    return [
+        ffmpeg, "-hide_banner", "-loglevel", "error",
+        "-i", source,
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1"
+    ]
+
+
+def decode_to_pcm(data: bytes, ffmpeg: str = FFMPEG_BINARY, sample_rate: int = SAMPLE_RATE, timeout: float = 60) -> bytes:
+    """
+    Decode an audio file held in memory to raw 16 kHz mono s16le PCM
+
+    The upload is piped through ffmpeg's stdin/stdout so nothing touches disk.
+    Containers that need seeking to be read (e.g. MP4/M4A with the moov atom at the
+    end) cannot be decoded from a pipe; only those fall back to one temporary file.
+
+    Args:
+        data: Encoded audio bytes in any format ffmpeg understands
+        ffmpeg: Path to the ffmpeg binary
+        sample_rate: Output sample rate in Hz
+        timeout: Maximum decoding time in seconds
+
+    Returns:
+        Raw PCM bytes
+
+    Raises:
+        AudioDecodeError: If the audio cannot be decoded
+    """
+    if not data:
+        raise AudioDecodeError("Empty audio upload")
+
+    result = subprocess.run(
+        _ffmpeg_command("pipe:0", ffmpeg, sample_rate),
+        input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout
+    )
+    if result.returncode == 0 and result.stdout:
+        return result.stdout
+
+    logger.info(f"Pipe decoding failed ({result.stderr.decode(errors='ignore').strip()[:200]}), retrying from a seekable file")
+    fd, path = tempfile.mkstemp(prefix="ryla_audio_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        result = subprocess.run(
+            _ffmpeg_command(path, ffmpeg, sample_rate),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout
+        )
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    if result.returncode != 0 or not result.stdout:
+        raise AudioDecodeError(result.stderr.decode(errors="ignore").strip() or "ffmpeg produced no audio")
+    return result.stdout
+
+
+def iter_chunks(pcm: bytes, chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    view = memoryview(pcm)
+    for start in range(0, len(view), chunk_bytes):
+        yield bytes(view[start:start + chunk_bytes])
+
+
+class StreamingDecoder:
+    """
+    Long-running ffmpeg process turning an incoming encoded stream (Opus/WebM/OGG...)
+    into 16 kHz mono s16le PCM as the chunks arrive
+
+    Writes go through worker threads and a dedicated reader thread pumps decoded PCM
+    into an asyncio queue, so this works on every event loop (including the
+    selector loop uvicorn uses on Windows, which has no subprocess support).
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        ffmpeg: str = FFMPEG_BINARY,
+        sample_rate: int = SAMPLE_RATE,
+        input_format: Optional[str] = None
+    ):
+        command = [ffmpeg, "-hide_banner", "-loglevel", "error"]
+        if input_format:
+            command += ["-f", input_format]
+        command += [
+            "-i", "pipe:0",
+            "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate),
+            "-flush_packets", "1",
+            "pipe:1"
+        ]
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self._reader = threading.Thread(target=self._pump, daemon=True)
+        self._reader.start()
+
+    def _pump(self):
+        while True:
+            chunk = self._process.stdout.read1(CHUNK_BYTES)
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, chunk)
+            if not chunk:
+                return
+
+    async def feed(self, data: bytes):
+        await self.loop.run_in_executor(None, self._write, data)
+
+    def _write(self, data: bytes):
+        self._process.stdin.write(data)
+        self._process.stdin.flush()
+
+    async def close_input(self):
+        """
+        Signal end of stream so ffmpeg flushes its remaining output and exits
+        """
+        await self.loop.run_in_executor(None, self._process.stdin.close)
+
+    async def read(self) -> bytes:
+        """
+        Next block of decoded PCM; b"" once ffmpeg has finished
+        """
+        return await self.queue.get()
+
+    def kill(self):
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
@@ -0,0 +1,227 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, Optional, Tuple
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+from src.audio_decoding import FFMPEG_BINARY, decode_to_pcm
+from src.response_cache import ResponseCache
+from src.speech_recognition import SpeechRecognizer
+from src.vad import VoiceActivityDetector
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".ogg", ".oga", ".opus", ".webm", ".m4a", ".flac", ".aac")
+
+# A named recording and a coroutine function returning its encoded bytes
+AudioSource = Tuple[str, Callable[[], Awaitable[bytes]]]
+
+
+class BatchTranscriber:
+    """
+    Transcribes many recordings through the same decode, VAD and recognizer path as /speech-to-text
+
+    Up to `concurrency` recordings are in flight at once, so ffmpeg decoding of
+    one file overlaps recognition of others. Transcripts are cached by the
+    sha256 of the recording's bytes, so re-running a folder only decodes new or
+    changed clips.
+    """
+
+    def __init__(
+        self,
+        speech: SpeechRecognizer,
+        vad: VoiceActivityDetector,
+        cache: ResponseCache,
+        concurrency: Optional[int] = None,
+        ffmpeg: str = FFMPEG_BINARY
+    ):
+        """
+        Args:
+            speech: Recognizer whose executor decodes the audio
+            vad: Silence trimming applied before recognition
+            cache: Transcript cache keyed by content hash and language
+            concurrency: Recordings processed at once, defaults to twice the recognizer concurrency
+            ffmpeg: Path to the ffmpeg binary
+        """
+        self.speech = speech
+        self.vad = vad
+        self.cache = cache
+        self.concurrency = max(1, concurrency or speech.max_concurrency * 2)
+        self.ffmpeg = ffmpeg
+        self.files = 0
+        self.cached = 0
+        self.failed = 0
+
+    async def run(self, sources: Iterable[AudioSource], language: str, words: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Transcribe every source, yielding one result per recording as soon as it is done
+
+        Results arrive in completion order; each carries the file name it belongs to.
+        With words set, results also hold columnar per-word timings.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        pending = iter(sources)
+
+        async def worker():
+            # Workers share one iterator, so recordings are only read when a slot frees up
+            for name, read in pending:
+                await queue.put(await self.transcribe_source(name, read, language, words))
+
+        def on_finished(future: asyncio.Future):
+            if not future.cancelled():
+                # Retrieve the exception here; it is re-raised by the await below if still consumed
+                future.exception()
+            queue.put_nowait(None)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+        finished = asyncio.gather(*workers)
+        finished.add_done_callback(on_finished)
+        try:
+            while True:
+                result = await queue.get()
+                if result is None:
+                    break
+                yield result
+            await finished
+        finally:
+            # Stops the workers when the consumer goes away (e.g. client disconnect)
+            finished.cancel()
+
+    async def transcribe_source(
+        self,
+        name: str,
+        read: Callable[[], Awaitable[bytes]],
+        language: str,
+        words: bool = False
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        self.files += 1
+        try:
+            data = await read()
+            digest = hashlib.sha256(data).hexdigest()
+            # Transcripts never expire, so the key covers everything that shapes them
+            key = ResponseCache.make_key(
+                "transcript", language, self.speech.models.identity(language), self.vad.config(), words, digest
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cached += 1
+                return {"file": name, "sha256": digest, "cached": True, **cached}
+
+            loop = asyncio.get_event_loop()
+            pcm = await loop.run_in_executor(None, decode_to_pcm, data, self.ffmpeg)
+            vad_result = await loop.run_in_executor(None, self.vad.split, pcm)
+            result = {"language": language, "vad": vad_result.summary()}
+            if words:
+                result["text"], result["words"] = await self.speech.transcribe_segments_words(
+                    language, vad_result.segments, vad_result.offsets
+                )
+            else:
+                result["text"] = await self.speech.transcribe_segments(language, vad_result.segments)
+            self.cache.put(key, result)
+            return {
+                "file": name,
+                "sha256": digest,
+                "cached": False,
+                **result,
+                "elapsed_ms": int((time.perf_counter() - started) * 1000)
+            }
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Could not transcribe {name}: {str(e)}")
+            return {"file": name, "error": str(e)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "files": self.files,
+            "cached": self.cached,
+            "failed": self.failed,
+            "concurrency": self.concurrency,
+            "transcript_cache": self.cache.stats()
+        }
+
+
+def iter_audio_files(paths: Iterable[str]) -> Iterator[str]:
+    """
+    Expand files and directories (recursively) into audio file paths, in sorted order
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for file_name in sorted(files):
+                    if file_name.lower().endswith(AUDIO_EXTENSIONS):
+                        yield os.path.join(root, file_name)
+        else:
+            yield path
+
+
+def file_sources(paths: Iterable[str]) -> Iterator[AudioSource]:
+    for path in iter_audio_files(paths):
+        def read(path=path) -> Awaitable[bytes]:
+            return asyncio.get_event_loop().run_in_executor(None, _read_file, path)
+        yield path, read
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def _main(args: argparse.Namespace):
+    from config import get_settings
+
+    settings = get_settings()
+    speech = SpeechRecognizer(
+        {"fr": settings.vosk_model_path_fr, "en": settings.vosk_model_path_en},
+        recognizers_per_language=settings.stt_recognizers_per_language,
+        concurrency_per_core=settings.stt_concurrency_per_core,
+        executor=settings.stt_executor,
+        process_workers=settings.stt_process_workers
+    )
+    vad = VoiceActivityDetector(
+        mode=settings.stt_vad_mode,
+        padding_ms=settings.stt_vad_padding_ms,
+        max_segment_seconds=settings.stt_vad_max_segment_seconds
+    )
+    cache = ResponseCache(
+        max_entries=settings.stt_transcript_cache_max_entries,
+        ttl_seconds=None,
+        db_path=settings.stt_transcript_cache_path or os.path.join(settings.model_cache_dir, "transcripts.sqlite"),
+        name="transcript_cache"
+    )
+    transcriber = BatchTranscriber(speech, vad, cache, concurrency=args.concurrency)
+
+    output = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    started = time.perf_counter()
+    try:
+        async for result in transcriber.run(file_sources(args.paths), args.language, words=args.words):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        speech.shutdown()
+
+    stats = transcriber.stats()
+    logger.info(
+        f"Transcribed {stats['files']} files in {time.perf_counter() - started:.1f}s "
+        f"({stats['cached']} cached, {stats['failed']} failed)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcribe audio files or folders to JSONL with the Vosk models")
+    parser.add_argument("paths", nargs="+", help="Audio files and/or directories to scan recursively")
+    parser.add_argument("--language", choices=["en", "fr"], default="en")
+    parser.add_argument("--output", help="JSONL file to append results to (default: stdout)")
+    parser.add_argument("--words", action="store_true", help="Include per-word start/end/confidence columns")
+    parser.add_argument("--concurrency", type=int, default=None, help="Recordings in flight at once")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args))
@@ -0,0 +1,157 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BatchMetrics:
+    """
+    Aggregated size/latency statistics for the batches run by a MicroBatcher
+    """
+
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+        self.last_batch: Dict[str, Any] = {}
+
+    def record(self, key: Hashable, size: int, wait_ms: float, run_ms: float):
+        self.batches += 1
+        self.items += size
+        self.max_batch_size = max(self.max_batch_size, size)
+        self.total_wait_ms += wait_ms
+        self.total_run_ms += run_ms
+        self.last_batch = {
+            "key": str(key),
+            "size": size,
+            "wait_ms": round(wait_ms, 2),
+            "run_ms": round(run_ms, 2)
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        batches = self.batches or 1
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / batches, 2),
+            "max_batch_size": self.max_batch_size,
+            "avg_wait_ms": round(self.total_wait_ms / batches, 2),
+            "avg_run_ms": round(self.total_run_ms / batches, 2),
+            "last_batch": self.last_batch
+        }
+
+
+class MicroBatcher:
+    """
+    Collects requests that arrive within a short window and runs them as one batch
+
+    Requests are grouped by key (e.g. (language, target)) so that every item in a
+    batch shares the same prompt and generation parameters. A batch is flushed once
+    it reaches max_batch_size or when the window opened by its first item expires.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[Hashable, List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        window_ms: float = 20.0,
+        name: str = "batcher",
+        runner: Optional[Callable[..., Awaitable[Any]]] = None
+    ):
+        """
+        Args:
+            batch_fn: Synchronous function taking (key, items) and returning one result per item
+            max_batch_size: Maximum number of items run in a single batch
+            window_ms: How long the first item of a batch waits for others to join
+            name: Name used in logs
+            runner: Optional coroutine function used to run batch_fn off the event loop,
+                called as runner(batch_fn, key, items)
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.window_ms = max(0.0, window_ms)
+        self.name = name
+        self.runner = runner
+        self.metrics = BatchMetrics()
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future, float]]] = {}
+        self._full: Dict[Hashable, asyncio.Event] = {}
+        self._flushers: Dict[Hashable, asyncio.Task] = {}
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        """
+        Queue an item for the batch identified by key and wait for its result
+        """
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((item, future, time.perf_counter()))
+
+        if key not in self._flushers:
+            self._full[key] = asyncio.Event()
+            self._flushers[key] = asyncio.create_task(self._flush_after_window(key))
+        if len(pending) >= self.max_batch_size:
+            self._full[key].set()
+
+        return await future
+
+    async def _flush_after_window(self, key: Hashable):
+        try:
+            await asyncio.wait_for(self._full[key].wait(), timeout=self.window_ms / 1000)
+        except asyncio.TimeoutError:
+            pass
+
+        pending = self._pending.pop(key, [])
+        batch, overflow = pending[:self.max_batch_size], pending[self.max_batch_size:]
+        del self._flushers[key]
+        del self._full[key]
+
+        # Items that arrived after the batch filled up start the next window
+        if overflow:
+            self._pending[key] = overflow
+            self._full[key] = asyncio.Event()
+            if len(overflow) >= self.max_batch_size:
+                self._full[key].set()
+            self._flushers[key] = asyncio.create_task(self._flush_after_window(key))
+
+        # Requests cancelled while waiting (e.g. client went away) are dropped
+        batch = [entry for entry in batch if not entry[1].done()]
+        if batch:
+            await self._run_batch(key, batch)
+
+    async def _run_batch(self, key: Hashable, batch: List[Tuple[Any, asyncio.Future, float]]):
+        items = [item for item, _, _ in batch]
+        started = time.perf_counter()
+        wait_ms = (started - min(enqueued for _, _, enqueued in batch)) * 1000
+
+        try:
+            if self.runner:
+                results = await self.runner(self.batch_fn, key, items)
+            else:
+                results = self.batch_fn(key, items)
+            if len(results) != len(items):
+                raise RuntimeError(f"{self.name} returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            logger.error(f"{self.name} batch for {key} failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        run_ms = (time.perf_counter() - started) * 1000
+        self.metrics.record(key, len(items), wait_ms, run_ms)
+        logger.debug(f"{self.name} ran batch of {len(items)} for {key} (wait {wait_ms:.1f} ms, run {run_ms:.1f} ms)")
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch_size,
+            "queued": sum(len(pending) for pending in self._pending.values()),
+            **self.metrics.snapshot()
+        }
@@ -0,0 +1,101 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class ConversationBuffer:
+    """
+    Recent turns of one practice session, kept as token ids
+
+    Each turn is tokenized once, when it is added, and stored with its ids, so
+    building the next model input only concatenates cached ids. The buffer drops
+    its oldest turns once their total exceeds max_tokens, since turns that no
+    longer fit the encoder window can never be used again.
+    """
+
+    __slots__ = ("checkpoint", "max_tokens", "turns")
+
+    def __init__(self, checkpoint: str = "", max_tokens: int = 120, turns: Optional[List[Tuple[str, List[int]]]] = None):
+        """
+        Args:
+            checkpoint: Chat model whose tokenizer produced the ids
+            max_tokens: Token budget of the history
+            turns: (text, token ids) pairs, oldest first
+        """
+        self.checkpoint = checkpoint
+        self.max_tokens = max_tokens
+        self.turns: List[Tuple[str, List[int]]] = turns or []
+
+    def add(self, text: str, token_ids: List[int]):
+        self.turns.append((text, list(token_ids)))
+        total = sum(len(ids) for _, ids in self.turns)
+        while len(self.turns) > 1 and total > self.max_tokens:
+            total -= len(self.turns.pop(0)[1])
+
+    def reset(self, checkpoint: str):
+        self.checkpoint = checkpoint
+        self.turns = []
+
+    def token_ids(self) -> Tuple[Tuple[int, ...], ...]:
+        """
+        Immutable snapshot of the turn ids, safe to hand to an inference thread
+        """
+        return tuple(tuple(ids) for _, ids in self.turns)
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"checkpoint": self.checkpoint, "max_tokens": self.max_tokens, "turns": [list(turn) for turn in self.turns]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ConversationBuffer":
+        return cls(
+            checkpoint=data.get("checkpoint", ""),
+            max_tokens=data.get("max_tokens", 120),
+            turns=[(text, ids) for text, ids in data.get("turns", [])]
+        )
+
+
+def build_input_ids(
+    history: Sequence[Sequence[int]],
+    current: Sequence[int],
+    budget: int,
+    separator: Sequence[int],
+    eos_token_id: Optional[int]
+) -> List[int]:
+    """
+    Assemble encoder input ids from cached turns, newest first, within a token budget
+
+    The current turn is always kept (left-truncated if it alone exceeds the budget);
+    earlier turns are added while they fit, joined by the separator ids and
+    followed by EOS, the layout BlenderBot was trained on.
+
+    Args:
+        history: Token ids of earlier turns, oldest first
+        current: Token ids of the turn being answered
+        budget: Maximum number of input ids, EOS included
+        separator: Ids placed between turns
+        eos_token_id: Appended at the end, None to append nothing
+
+    Returns:
+        Input ids for one sequence
+    """
+    room = budget - (1 if eos_token_id is not None else 0)
+    current = list(current)[-room:] if room > 0 else []
+    used = len(current)
+
+    kept = []
+    for turn in reversed(history):
+        cost = len(turn) + len(separator)
+        if used + cost > room:
+            break
+        kept.append(turn)
+        used += cost
+
+    ids: List[int] = []
+    for turn in reversed(kept):
+        ids.extend(turn)
+        ids.extend(separator)
+    ids.extend(current)
+    if eos_token_id is not None:
+        ids.append(eos_token_id)
+    return ids
@@ -0,0 +1,182 @@
+from typing import Any, Dict, Optional, Sequence
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (inclusive) of the input-length buckets, in tokens; longer inputs fall in a last bucket
+DEFAULT_BUCKETS = (16, 32, 64, 128, 256)
+
+
+class _BucketState:
+    __slots__ = ("beams", "ewma_ms", "samples", "since_change")
+
+    def __init__(self, beams: int):
+        self.beams = beams
+        self.ewma_ms: Optional[float] = None
+        self.samples = 0
+        self.since_change = 0
+
+
+class GenerationPolicy:
+    """
+    Decoding settings for one generation task, chosen from the input length and a latency SLO
+
+    Inputs are grouped into token-length buckets. Each bucket starts at max_beams and
+    keeps an EWMA of the measured generate() latency: when it exceeds the SLO the
+    bucket drops one beam (down to greedy search), and when one more beam is predicted
+    to stay comfortably within the SLO it gains one back. Unless the caller sets a
+    budget (e.g. a chat reply, whose length does not depend on the message), the
+    length budget follows the input length, so long inputs are not cut off.
+
+    Sampling and beam search are never mixed: sampling always decodes a single beam.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_beams: int = 4,
+        latency_slo_ms: float = 0.0,
+        length_ratio: float = 1.5,
+        min_new_tokens: int = 16,
+        max_new_tokens: int = 512,
+        buckets: Sequence[int] = DEFAULT_BUCKETS,
+        ewma_alpha: float = 0.2,
+        cooldown: int = 5,
+        headroom: float = 0.8
+    ):
+        """
+        Args:
+            name: Task name used in logs and stats
+            max_beams: Beam width when latency allows it
+            latency_slo_ms: Target generate() latency, 0 to never adapt the beam width
+            length_ratio: New tokens allowed per input token
+            min_new_tokens: Smallest length budget, whatever the input length
+            max_new_tokens: Largest length budget
+            buckets: Upper bounds of the input-length buckets, in tokens
+            ewma_alpha: Weight of the newest latency sample
+            cooldown: Samples a bucket must see between two beam width changes
+            headroom: Fraction of the SLO a wider beam must be predicted to stay within
+        """
+        self.name = name
+        self.max_beams = max(1, max_beams)
+        self.latency_slo_ms = latency_slo_ms
+        self.length_ratio = length_ratio
+        self.min_new_tokens = min_new_tokens
+        self.max_new_tokens = max(min_new_tokens, max_new_tokens)
+        self.buckets = tuple(sorted(buckets))
+        self.ewma_alpha = ewma_alpha
+        self.cooldown = max(1, cooldown)
+        self.headroom = headroom
+        self._lock = threading.Lock()
+        self._states = [_BucketState(self.max_beams) for _ in range(len(self.buckets) + 1)]
+        self.beams_lowered = 0
+        self.beams_raised = 0
+
+    def bucket(self, input_tokens: int) -> int:
+        return bisect.bisect_left(self.buckets, input_tokens)
+
+    def new_token_budget(self, input_tokens: int, budget: Optional[int] = None) -> int:
+        if budget is None:
+            budget = max(self.min_new_tokens, int(input_tokens * self.length_ratio))
+        return min(budget, self.max_new_tokens)
+
+    def params(self, input_tokens: int, budget: Optional[int] = None, temperature: Optional[float] = None) -> Dict[str, Any]:
+        """
+        generate() keyword arguments for an input of input_tokens tokens
+
+        Args:
+            input_tokens: Length of the (longest) encoder input
+            budget: Fixed length budget (e.g. the proficiency's reply length), None to scale with the input
+            temperature: Sample at this temperature with a single beam, None for beam search
+        """
+        params: Dict[str, Any] = {'max_new_tokens': self.new_token_budget(input_tokens, budget)}
+        if temperature is not None:
+            params.update(num_beams=1, do_sample=True, temperature=temperature, top_p=0.9)
+            return params
+
+        with self._lock:
+            beams = self._states[self.bucket(input_tokens)].beams
+        params['num_beams'] = beams
+        if beams > 1:
+            params['early_stopping'] = True
+        return params
+
+    def record(self, input_tokens: int, latency_ms: float, beams: int):
+        """
+        Feed one measured generate() latency back into its bucket
+
+        Samples decoded with a beam width other than the bucket's current one (e.g.
+        sampled or streamed generations) are ignored, so they cannot skew the EWMA.
+        """
+        if self.latency_slo_ms <= 0:
+            return
+        with self._lock:
+            state = self._states[self.bucket(input_tokens)]
+            if beams != state.beams:
+                return
+            state.samples += 1
+            state.since_change += 1
+            if state.ewma_ms is None:
+                state.ewma_ms = latency_ms
+            else:
+                state.ewma_ms += self.ewma_alpha * (latency_ms - state.ewma_ms)
+            if state.since_change < self.cooldown:
+                return
+
+            if state.ewma_ms > self.latency_slo_ms and state.beams > 1:
+                self._resize(state, state.beams - 1)
+                self.beams_lowered += 1
+            elif (
+                state.beams < self.max_beams
+                and state.ewma_ms * (state.beams + 1) / state.beams < self.latency_slo_ms * self.headroom
+            ):
+                self._resize(state, state.beams + 1)
+                self.beams_raised += 1
+
+    def _resize(self, state: _BucketState, beams: int):
+        # Decoding cost grows roughly linearly with the beam width; rescale the estimate
+        # so the next decision does not wait for the EWMA to catch up
+        state.ewma_ms = state.ewma_ms * beams / state.beams
+        logger.info(f"{self.name}: beam width {state.beams} -> {beams} at {state.ewma_ms:.0f} ms estimated")
+        state.beams = beams
+        state.since_change = 0
+
+    def at_full_width(self, params: Dict[str, Any]) -> bool:
+        """
+        Whether params (from params()) decode at max_beams, i.e. without being degraded for latency
+        """
+        return params.get('num_beams') == self.max_beams and not params.get('do_sample')
+
+    def describe(self) -> Dict[str, Any]:
+        """
+        The static part of the policy, for cache keys
+
+        Only results decoded at full width should be cached under these keys (see
+        at_full_width()), so output degraded at peak load is never served off-peak.
+        """
+        return {
+            'policy': self.name,
+            'max_beams': self.max_beams,
+            'length_ratio': self.length_ratio,
+            'min_new_tokens': self.min_new_tokens,
+            'max_new_tokens': self.max_new_tokens
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        bounds = [f"<={bound}" for bound in self.buckets] + [f">{self.buckets[-1]}" if self.buckets else "all"]
+        with self._lock:
+            return {
+                "latency_slo_ms": self.latency_slo_ms,
+                "beams_lowered": self.beams_lowered,
+                "beams_raised": self.beams_raised,
+                "buckets": {
+                    bound: {
+                        "beams": state.beams,
+                        "ewma_ms": round(state.ewma_ms, 1) if state.ewma_ms is not None else None,
+                        "samples": state.samples
+                    }
+                    for bound, state in zip(bounds, self._states)
+                }
+            }
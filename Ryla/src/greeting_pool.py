@@ -0,0 +1,134 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+from src.inference_executor import InferenceQueueFull
+
+logger = logging.getLogger(__name__)
+
+
+class GreetingPool:
+    """
+    Pre-generated session greetings per (language, proficiency)
+
+    Session initialization takes a ready greeting in O(1) instead of running a chat
+    generate. Pools are refilled in the background whenever they drop below
+    low_water, and a periodic refresh replaces greetings older than max_age_seconds
+    so returning users do not keep seeing the same lines.
+    """
+
+    def __init__(
+        self,
+        generate_fn: Callable[[str, str], Awaitable[str]],
+        pool_size: int = 8,
+        low_water: int = 3,
+        max_age_seconds: float = 3600,
+        refresh_interval_seconds: float = 600
+    ):
+        """
+        Args:
+            generate_fn: Coroutine function (language, proficiency) -> greeting
+            pool_size: Number of greetings kept per (language, proficiency)
+            low_water: Pool size below which a background refill starts
+            max_age_seconds: Greetings older than this are discarded
+            refresh_interval_seconds: Period of the background refresh loop
+        """
+        self.generate_fn = generate_fn
+        self.pool_size = max(1, pool_size)
+        self.low_water = min(max(0, low_water), self.pool_size)
+        self.max_age_seconds = max_age_seconds
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._pools: Dict[Tuple[str, str], Deque[Tuple[str, float]]] = {}
+        self._filling: Set[Tuple[str, str]] = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.served = 0
+        self.empty = 0
+        self.generated = 0
+
+    def take(self, language: str, proficiency: str) -> Optional[str]:
+        """
+        Pop a fresh greeting, or None if the pool is empty
+
+        Always schedules a refill when the pool runs low.
+        """
+        key = (language, proficiency)
+        pool = self._pools.setdefault(key, deque())
+        greeting = None
+        now = time.time()
+        while pool:
+            text, created = pool.popleft()
+            if now - created <= self.max_age_seconds:
+                greeting = text
+                break
+
+        if greeting is None:
+            self.empty += 1
+        else:
+            self.served += 1
+        if len(pool) < self.low_water:
+            self.schedule_fill(language, proficiency)
+        return greeting
+
+    def schedule_fill(self, language: str, proficiency: str):
+        key = (language, proficiency)
+        if key in self._filling:
+            return
+        self._filling.add(key)
+        asyncio.get_running_loop().create_task(self._fill(key))
+
+    def schedule_fill_all(self, language: str, proficiencies: Iterable[str]):
+        for proficiency in proficiencies:
+            self.schedule_fill(language, proficiency)
+
+    async def _fill(self, key: Tuple[str, str]):
+        pool = self._pools.setdefault(key, deque())
+        try:
+            while len(pool) < self.pool_size:
+                greeting = await self.generate_fn(*key)
+                if not greeting:
+                    break
+                pool.append((greeting, time.time()))
+                self.generated += 1
+        except InferenceQueueFull:
+            # Live traffic has priority, the next take() or refresh retries
+            logger.info(f"Greeting refill for {key} deferred, inference queue is full")
+        except Exception as e:
+            logger.error(f"Greeting refill for {key} failed: {e}")
+        finally:
+            self._filling.discard(key)
+
+    def start(self):
+        """
+        Start the periodic refresh loop on the running event loop
+        """
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval_seconds)
+            cutoff = time.time() - self.max_age_seconds
+            for key, pool in list(self._pools.items()):
+                while pool and pool[0][1] < cutoff:
+                    pool.popleft()
+                if len(pool) < self.pool_size:
+                    self.schedule_fill(*key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "served": self.served,
+            "empty": self.empty,
+            "generated": self.generated,
+            "pools": {f"{language}/{proficiency}": len(pool) for (language, proficiency), pool in self._pools.items()}
+        }
@@ -0,0 +1,105 @@
+from typing import Any, Iterable
+import argparse
+import logging
+import os
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch_int8", "onnx")
+
+
+def _onnx_export_dir(cache_dir: str, checkpoint: str) -> str:
+    return os.path.join(cache_dir, "onnx", checkpoint.replace("/", "--"))
+
+
+def _load_ort_class():
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError:
+        return None
+    return ORTModelForSeq2SeqLM
+
+
+def export_onnx(checkpoint: str, cache_dir: str) -> str:
+    """
+    Export checkpoint to an ONNX encoder-decoder with KV-cache, unless already exported
+
+    Args:
+        checkpoint: Hugging Face model name or local path
+        cache_dir: Root directory for converted artifacts (Settings.model_cache_dir)
+
+    Returns:
+        Directory holding the exported model
+    """
+    ort_class = _load_ort_class()
+    if ort_class is None:
+        raise RuntimeError("The onnx backend requires optimum[onnxruntime] to be installed")
+
+    export_dir = _onnx_export_dir(cache_dir, checkpoint)
+    if os.path.isdir(export_dir) and os.listdir(export_dir):
+        return export_dir
+
+    logger.info(f"Exporting {checkpoint} to ONNX under {export_dir}")
+    model = ort_class.from_pretrained(checkpoint, export=True, use_cache=True, cache_dir=cache_dir)
+    model.save_pretrained(export_dir)
+    logger.info(f"Exported {checkpoint} to ONNX")
+    return export_dir
+
+
+def load_model(checkpoint: str, model_class: Any, device: torch.device, backend: str, cache_dir: str) -> Any:
+    """
+    Load checkpoint with the selected inference backend
+
+    Falls back to plain torch when a backend cannot be used on this node
+    (missing onnxruntime, or int8 quantization requested on a GPU).
+
+    Args:
+        checkpoint: Hugging Face model name or local path
+        model_class: Class whose from_pretrained loads the torch model
+        device: Device the model should run on
+        backend: One of "torch", "torch_int8" or "onnx"
+        cache_dir: Root directory for downloads and converted artifacts
+    """
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown inference backend '{backend}', using torch")
+        backend = "torch"
+
+    if backend == "onnx":
+        ort_class = _load_ort_class()
+        if ort_class is None:
+            logger.warning("optimum[onnxruntime] is not installed, using torch backend")
+        else:
+            provider = "CUDAExecutionProvider" if device.type == "cuda" else "CPUExecutionProvider"
+            return ort_class.from_pretrained(export_onnx(checkpoint, cache_dir), use_cache=True, provider=provider)
+
+    model = model_class.from_pretrained(checkpoint, cache_dir=cache_dir).to(device)
+    model.eval()
+
+    if backend == "torch_int8":
+        if device.type != "cpu":
+            logger.warning("Dynamic int8 quantization is CPU-only, keeping fp32 weights")
+        else:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    return model
+
+
+def export_models(checkpoints: Iterable[str], cache_dir: str):
+    """
+    Write ONNX artifacts for every checkpoint so workers start without exporting
+    """
+    for checkpoint in checkpoints:
+        export_onnx(checkpoint, cache_dir)
+
+
+if __name__ == "__main__":
+    from config import get_settings
+
+    parser = argparse.ArgumentParser(description="Export Ryla models to ONNX ahead of deployment")
+    parser.add_argument("checkpoints", nargs="*", default=["grammarly/coedit-large", "facebook/blenderbot-400M-distill"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    export_models(args.checkpoints, get_settings().model_cache_dir)
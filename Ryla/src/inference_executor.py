@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+import asyncio
+import logging
+import threading
+import time
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(Exception):
+    """
+    Raised when the inference queue is at capacity and a request must be rejected
+    """
+
+
+class InferenceExecutor:
+    """
+    Bounded thread pool that runs blocking model calls away from the event loop
+
+    torch releases the GIL inside its kernels, so a small pool of threads sharing the
+    loaded models gives real parallelism while the event loop keeps serving I/O.
+    Requests beyond max_queue_depth waiting jobs are rejected with InferenceQueueFull
+    so callers can apply backpressure instead of piling up latency.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue_depth: int = 16,
+        intra_op_threads: int = 0,
+        name: str = "inference"
+    ):
+        """
+        Args:
+            max_workers: Number of threads running model calls concurrently
+            max_queue_depth: Maximum number of jobs waiting for a free worker
+            intra_op_threads: torch intra-op threads per call (0 keeps torch's default)
+            name: Thread name prefix and log name
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self.name = name
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._total_run_ms = 0.0
+
+        if intra_op_threads > 0:
+            # Avoid oversubscribing cores: each worker thread runs its own torch kernels
+            torch.set_num_threads(intra_op_threads)
+        logger.info(
+            f"{name} executor started with {self.max_workers} workers, "
+            f"queue depth {self.max_queue_depth}, {torch.get_num_threads()} torch threads"
+        )
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on a worker thread and wait for its result
+
+        Cancelling the awaiting coroutine drops the job if it has not started yet.
+
+        Raises:
+            InferenceQueueFull: If max_queue_depth jobs are already waiting
+        """
+        with self._lock:
+            if self._queued >= self.max_queue_depth and self._running >= self.max_workers:
+                self._rejected += 1
+                raise InferenceQueueFull(f"{self.name} queue is full ({self._queued} waiting)")
+            self._queued += 1
+
+        future = self._pool.submit(self._execute, fn, args, kwargs)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+                    self._cancelled += 1
+            raise
+
+    def _execute(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._total_run_ms += (time.perf_counter() - started) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue_depth": self.max_queue_depth,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "cancelled": self._cancelled,
+                "avg_run_ms": round(self._total_run_ms / (self._completed or 1), 2)
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,104 @@
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+from typing import Any, Dict, Optional
+from src.inference_backends import load_model
+import logging
+import threading
+import time
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class ModelEntry:
+    """
+    A loaded checkpoint shared by every language and code path that uses it
+    """
+
+    def __init__(self, checkpoint: str, model: Any, tokenizer: Any, load_ms: float):
+        self.checkpoint = checkpoint
+        self.model = model
+        self.tokenizer = tokenizer
+        self.load_ms = load_ms
+        self.refcount = 0
+
+
+class ModelRegistry:
+    """
+    Loads each checkpoint once and hands out shared model/tokenizer instances
+
+    Entries are reference counted: every acquire() must be paired with a release(),
+    and a checkpoint is dropped from memory once nothing references it anymore.
+    """
+
+    def __init__(self, device: torch.device, backend: str = "torch", cache_dir: Optional[str] = None):
+        """
+        Args:
+            device: Device models are placed on
+            backend: Inference backend used to load models ("torch", "torch_int8" or "onnx")
+            cache_dir: Directory for downloaded checkpoints and converted artifacts
+        """
+        self.device = device
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self._entries: Dict[str, ModelEntry] = {}
+        self._lock = threading.Lock()
+        self._checkpoint_locks: Dict[str, threading.Lock] = {}
+
+    def acquire(self, checkpoint: str, model_class: Any = AutoModelForSeq2SeqLM, tokenizer_class: Any = AutoTokenizer) -> ModelEntry:
+        """
+        Get the shared entry for checkpoint, loading it on first use
+
+        Args:
+            checkpoint: Hugging Face model name or local path
+            model_class: Class whose from_pretrained loads the model
+            tokenizer_class: Class whose from_pretrained loads the tokenizer
+
+        Returns:
+            The shared ModelEntry, with its reference count incremented
+        """
+        with self._lock:
+            checkpoint_lock = self._checkpoint_locks.setdefault(checkpoint, threading.Lock())
+
+        # Only loads of the same checkpoint wait on each other
+        with checkpoint_lock:
+            entry = self._entries.get(checkpoint)
+            if entry is None:
+                entry = self._load(checkpoint, model_class, tokenizer_class)
+            with self._lock:
+                self._entries[checkpoint] = entry
+                entry.refcount += 1
+            return entry
+
+    def release(self, checkpoint: str):
+        """
+        Drop one reference to checkpoint, unloading it when none remain
+        """
+        with self._lock:
+            entry = self._entries.get(checkpoint)
+            if entry is None:
+                return
+            entry.refcount -= 1
+            if entry.refcount <= 0:
+                del self._entries[checkpoint]
+                logger.info(f"Unloaded {checkpoint}")
+
+    def _load(self, checkpoint: str, model_class: Any, tokenizer_class: Any) -> ModelEntry:
+        logger.info(f"Loading {checkpoint} with {self.backend} backend")
+        started = time.perf_counter()
+        tokenizer = tokenizer_class.from_pretrained(checkpoint, cache_dir=self.cache_dir)
+        model = load_model(checkpoint, model_class, self.device, self.backend, self.cache_dir)
+        load_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Loaded {checkpoint} in {load_ms:.0f} ms")
+        return ModelEntry(checkpoint, model, tokenizer, load_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                checkpoint: {
+                    "refcount": entry.refcount,
+                    "load_ms": round(entry.load_ms),
+                    "backend": self.backend
+                }
+                for checkpoint, entry in self._entries.items()
+            }
@@ -0,0 +1,233 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import copy
+import logging
+import threading
+import time
+
+from src.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileBackend:
+    """
+    Storage holding each user's model_data record
+    """
+
+    def get(self, user_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def set(self, user_id: str, data: Dict[str, Any]):
+        raise NotImplementedError
+
+    def listen(self, on_change: Callable[[str], None]) -> Optional[Any]:
+        """
+        Call on_change(user_id) whenever a user's record changes remotely
+
+        Returns a handle with close(), or None if the backend cannot push changes.
+        """
+        return None
+
+
+class FirebaseProfileBackend(ProfileBackend):
+    """
+    Reads and writes users/{user_id}/model_data in the Firebase Realtime Database
+    """
+
+    def get(self, user_id: str) -> Dict[str, Any]:
+        from firebase_admin import db
+        return db.reference(f'users/{user_id}/model_data').get() or {}
+
+    def set(self, user_id: str, data: Dict[str, Any]):
+        from firebase_admin import db
+        db.reference(f'users/{user_id}/model_data').set(data)
+
+    def listen(self, on_change: Callable[[str], None]) -> Optional[Any]:
+        from firebase_admin import db
+
+        def handle(event):
+            # Paths look like "/<user_id>/model_data/..."; "/" is the initial snapshot
+            parts = [part for part in event.path.split("/") if part]
+            if parts:
+                on_change(parts[0])
+
+        return db.reference('users').listen(handle)
+
+
+class InMemoryProfileBackend(ProfileBackend):
+    """
+    Process-local stand-in for the Realtime Database, for tests and offline runs
+    """
+
+    def __init__(self, profiles: Optional[Dict[str, Dict[str, Any]]] = None):
+        self._profiles = copy.deepcopy(profiles or {})
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def get(self, user_id: str) -> Dict[str, Any]:
+        with self._lock:
+            return copy.deepcopy(self._profiles.get(user_id, {}))
+
+    def set(self, user_id: str, data: Dict[str, Any]):
+        with self._lock:
+            self._profiles[user_id] = copy.deepcopy(data)
+            listeners = list(self._listeners)
+        for on_change in listeners:
+            on_change(user_id)
+
+    def listen(self, on_change: Callable[[str], None]) -> Optional[Any]:
+        with self._lock:
+            self._listeners.append(on_change)
+        return None
+
+
+class UserProfileCache:
+    """
+    TTL cache of user profiles in front of a ProfileBackend
+
+    Entries are kept in an OrderedDict bounded by max_entries, least recently used
+    first out; expired entries are dropped when they are read and from the old end
+    on every write. Concurrent misses for the same user share one backend read
+    (single-flight), writes go through to the backend before updating the cache,
+    and a backend that supports listen() can invalidate entries as soon as they
+    change remotely. A read that was in flight when its user's profile changed is
+    returned to its waiters but not cached, so it cannot overwrite the newer state.
+    """
+
+    def __init__(self, backend: ProfileBackend, ttl_seconds: float = 300, timeout: float = 5.0, max_entries: int = 10000):
+        """
+        Args:
+            backend: Where profiles are stored
+            ttl_seconds: How long a fetched profile is served from memory
+            timeout: Maximum time to wait for a backend read or write
+            max_entries: Profiles kept at most; the least recently used one is evicted
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._loads = SingleFlight()
+        # Per-user change counters, kept only while a backend read for the user is in flight
+        self._loading: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}
+        self._listener = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_reads = 0
+
+    async def get(self, user_id: str) -> Dict[str, Any]:
+        """
+        Get a user's profile, reading the backend only on a miss or expired entry
+
+        Raises:
+            asyncio.TimeoutError: If the backend read exceeds timeout
+        """
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return dict(entry[0])
+            del self._entries[user_id]
+            self.expirations += 1
+
+        self.misses += 1
+        data = await self._loads.do(user_id, lambda: self._load(user_id))
+        return dict(data)
+
+    async def _load(self, user_id: str) -> Dict[str, Any]:
+        loop = asyncio.get_event_loop()
+        version = self._versions.get(user_id, 0)
+        self._loading[user_id] = self._loading.get(user_id, 0) + 1
+        try:
+            data = await asyncio.wait_for(
+                loop.run_in_executor(None, self.backend.get, user_id),
+                timeout=self.timeout
+            )
+            if self._versions.get(user_id, 0) == version:
+                self._store(user_id, data)
+            else:
+                self.stale_reads += 1
+            return data
+        finally:
+            self._loading[user_id] -= 1
+            if not self._loading[user_id]:
+                del self._loading[user_id]
+                self._versions.pop(user_id, None)
+
+    def _changed(self, user_id: str):
+        # Reads already in flight may return the old profile: keep them out of the cache
+        # and make later misses start a fresh read instead of joining them
+        if user_id in self._loading:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        self._loads.forget(user_id)
+
+    async def put(self, user_id: str, data: Dict[str, Any]):
+        """
+        Write a profile through to the backend, then cache it
+        """
+        loop = asyncio.get_event_loop()
+        await asyncio.wait_for(
+            loop.run_in_executor(None, self.backend.set, user_id, data),
+            timeout=self.timeout
+        )
+        self._changed(user_id)
+        self._store(user_id, dict(data))
+
+    def _store(self, user_id: str, data: Dict[str, Any]):
+        now = time.monotonic()
+        self._entries[user_id] = (data, now + self.ttl_seconds)
+        self._entries.move_to_end(user_id)
+        # Expired or over the bound: only the least recently used end is ever checked
+        while self._entries:
+            oldest_id, (_, expires_at) = next(iter(self._entries.items()))
+            if expires_at <= now:
+                self.expirations += 1
+            elif len(self._entries) > self.max_entries:
+                self.evictions += 1
+            else:
+                return
+            del self._entries[oldest_id]
+
+    def invalidate(self, user_id: str):
+        self._changed(user_id)
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def start_listening(self, loop: asyncio.AbstractEventLoop):
+        """
+        Subscribe to backend change events; callbacks arrive on backend threads
+        """
+        try:
+            self._listener = self.backend.listen(
+                lambda user_id: loop.call_soon_threadsafe(self.invalidate, user_id)
+            )
+            logger.info("Profile cache listening for remote changes")
+        except Exception as e:
+            logger.warning(f"Profile change listener unavailable, relying on TTL: {e}")
+
+    def stop_listening(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "backend_reads": self._loads.calls,
+            "shared_reads": self._loads.shared,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_reads": self.stale_reads,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,218 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency that keeps failing, and probes it before trusting it again
+
+    closed: calls go through; failure_threshold consecutive failures open the circuit.
+    open: calls are rejected immediately until reset_timeout has passed.
+    half_open: up to half_open_max_calls probe calls go through; a success closes the
+    circuit, a failure opens it again with the reset timeout doubled (up to
+    max_reset_timeout), so a dependency that stays down is probed less and less often.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_reset_timeout: float = 300.0,
+        half_open_max_calls: int = 1
+    ):
+        """
+        Args:
+            name: Dependency name used in logs and stats
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before the first probe
+            max_reset_timeout: Upper bound for the backed-off reset timeout
+            half_open_max_calls: Concurrent probe calls allowed while half-open
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max(reset_timeout, max_reset_timeout)
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._state = self.CLOSED
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._reset_timeout = reset_timeout
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+            logger.info(f"Circuit {self.name} half-open, probing")
+        return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Whether a call may go through now; a True while half-open reserves a probe slot
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._reset_timeout = self.base_reset_timeout
+
+    def record_failure(self):
+        with self._lock:
+            state = self._current_state()
+            self._consecutive_failures += 1
+            if state == self.HALF_OPEN:
+                self._reset_timeout = min(self._reset_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif state == self.CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def record_cancelled(self):
+        """
+        Give back the probe slot of a call that ended without an outcome (e.g. was cancelled)
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning(f"Circuit {self.name} open for {self._reset_timeout:g}s after {self._consecutive_failures} failures")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._consecutive_failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "reset_timeout_seconds": self._reset_timeout
+            }
+
+
+class LatencyTracker:
+    """
+    Rolling window of recent call latencies with percentile lookups
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """
+        Args:
+            window: Number of most recent samples kept
+            min_samples: Samples needed before percentiles are reported
+        """
+        self._samples: deque = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, latency_ms: float):
+        self._samples.append(latency_ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        q-th percentile (0-100) of the window in ms, None until min_samples are recorded
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            "samples": len(self._samples),
+            "p50_ms": round(p50, 1) if p50 is not None else None,
+            "p95_ms": round(p95, 1) if p95 is not None else None
+        }
+
+
+async def hedged(
+    call: Callable[[], Awaitable[T]],
+    hedge_after: Optional[float],
+    is_success: Callable[[Any], bool] = lambda result: result is not None,
+    on_hedge: Optional[Callable[[], None]] = None
+) -> Optional[T]:
+    """
+    Run call(), starting a second identical attempt if the first is still running after hedge_after seconds
+
+    The first successful result wins and the other attempt is cancelled. If an
+    attempt fails while the other is still running, the other one is awaited.
+
+    Args:
+        call: Starts one attempt
+        hedge_after: Delay before the hedge attempt, None to never hedge
+        is_success: Whether a result counts as success
+        on_hedge: Called when the hedge attempt is started
+
+    Returns:
+        The first successful result, or the last result if no attempt succeeded
+
+    Raises:
+        Exception: The last attempt's exception if every attempt raised
+    """
+    first = asyncio.ensure_future(call())
+    if hedge_after is None:
+        return await first
+
+    attempts = [first]
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=hedge_after)
+        if not done:
+            if on_hedge is not None:
+                on_hedge()
+            attempts.append(asyncio.ensure_future(call()))
+
+        pending = set(attempts)
+        result: Any = None
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is not None:
+                    error = attempt.exception()
+                    continue
+                result, error = attempt.result(), None
+                if is_success(result):
+                    return result
+        if error is not None:
+            raise error
+        return result
+    finally:
+        for attempt in attempts:
+            if not attempt.done():
+                attempt.cancel()
@@ -0,0 +1,226 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import json
+import logging
+import time
+
+from src.conversation import ConversationBuffer
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRecord:
+    """
+    One user's practice session settings and conversation history
+
+    Uses __slots__ so the many idle sessions a busy worker holds stay small.
+    """
+
+    __slots__ = ("language", "proficiency", "target", "created_at", "last_interaction", "history")
+
+    def __init__(
+        self,
+        language: str,
+        proficiency: str,
+        target: str,
+        created_at: Optional[float] = None,
+        last_interaction: Optional[float] = None,
+        history: Optional[ConversationBuffer] = None
+    ):
+        now = time.time()
+        self.language = language
+        self.proficiency = proficiency
+        self.target = target
+        self.created_at = created_at if created_at is not None else now
+        self.last_interaction = last_interaction if last_interaction is not None else now
+        self.history = history if history is not None else ConversationBuffer()
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {slot: getattr(self, slot) for slot in self.__slots__}
+        data["history"] = self.history.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionRecord":
+        fields = {slot: data[slot] for slot in cls.__slots__ if slot in data}
+        if "history" in fields:
+            fields["history"] = ConversationBuffer.from_dict(fields["history"])
+        return cls(**fields)
+
+
+class SessionStore:
+    """
+    Where MultilingualAssistant keeps user sessions
+    """
+
+    async def get(self, user_id: str) -> Optional[SessionRecord]:
+        """
+        The user's session, refreshing its idle timer; None if absent or expired
+        """
+        raise NotImplementedError
+
+    async def put(self, user_id: str, record: SessionRecord):
+        raise NotImplementedError
+
+    async def delete(self, user_id: str):
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local sessions bounded by count (LRU) and by idle time
+
+    Records are kept in last-use order, so both evictions only ever look at the
+    front of the OrderedDict. Expired sessions are dropped as they are found and
+    on every write, without a background sweeper.
+    """
+
+    def __init__(self, max_entries: int = 10000, idle_ttl_seconds: float = 3600):
+        """
+        Args:
+            max_entries: Sessions kept at most; the least recently used one is evicted
+            idle_ttl_seconds: Sessions unused for this long are dropped
+        """
+        self.max_entries = max(1, max_entries)
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._records: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evicted_lru = 0
+        self.evicted_idle = 0
+
+    async def get(self, user_id: str) -> Optional[SessionRecord]:
+        record = self._records.get(user_id)
+        now = time.time()
+        if record is not None and now - record.last_interaction > self.idle_ttl_seconds:
+            del self._records[user_id]
+            self.evicted_idle += 1
+            record = None
+        if record is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        record.last_interaction = now
+        self._records.move_to_end(user_id)
+        return record
+
+    async def put(self, user_id: str, record: SessionRecord):
+        record.last_interaction = time.time()
+        self._records[user_id] = record
+        self._records.move_to_end(user_id)
+        self._evict(record.last_interaction)
+
+    async def delete(self, user_id: str):
+        self._records.pop(user_id, None)
+
+    def _evict(self, now: float):
+        while self._records:
+            oldest_id, oldest = next(iter(self._records.items()))
+            if now - oldest.last_interaction > self.idle_ttl_seconds:
+                self.evicted_idle += 1
+            elif len(self._records) > self.max_entries:
+                self.evicted_lru += 1
+            else:
+                return
+            del self._records[oldest_id]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "sessions": len(self._records),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted_lru": self.evicted_lru,
+            "evicted_idle": self.evicted_idle,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions shared by every worker process through a Redis-protocol server
+
+    Each session is one JSON value whose expiry is reset on every access, so Redis
+    enforces the idle TTL. Any client with the redis.asyncio get/set/expire/delete
+    API can be injected (e.g. fakeredis for tests); otherwise one is created from url.
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        idle_ttl_seconds: float = 3600,
+        key_prefix: str = "ryla:session:",
+        client: Optional[Any] = None
+    ):
+        """
+        Args:
+            url: Server URL, used when no client is given
+            idle_ttl_seconds: Sessions unused for this long expire
+            key_prefix: Prefix of every session key
+            client: Ready-made async Redis client
+
+        Raises:
+            RuntimeError: If no client is given and the redis package is not installed
+        """
+        if client is None:
+            if redis_asyncio is None:
+                raise RuntimeError("SESSION_BACKEND=redis requires the redis package")
+            client = redis_asyncio.from_url(url)
+        self.client = client
+        self.idle_ttl = max(1, int(idle_ttl_seconds))
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, user_id: str) -> str:
+        return f"{self.key_prefix}{user_id}"
+
+    async def get(self, user_id: str) -> Optional[SessionRecord]:
+        try:
+            raw = await self.client.get(self._key(user_id))
+            if raw is None:
+                self.misses += 1
+                return None
+            await self.client.expire(self._key(user_id), self.idle_ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Session store read failed for {user_id}: {str(e)}")
+            return None
+
+        self.hits += 1
+        record = SessionRecord.from_dict(json.loads(raw))
+        record.last_interaction = time.time()
+        return record
+
+    async def put(self, user_id: str, record: SessionRecord):
+        record.last_interaction = time.time()
+        try:
+            await self.client.set(self._key(user_id), json.dumps(record.to_dict()), ex=self.idle_ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Session store write failed for {user_id}: {str(e)}")
+
+    async def delete(self, user_id: str):
+        await self.client.delete(self._key(user_id))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            # Redis expires idle sessions itself; a miss is a new or expired session
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
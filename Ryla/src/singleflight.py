@@ -0,0 +1,44 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one in-flight call
+
+    The first caller for a key starts the call; callers arriving while it runs
+    await the same result instead of issuing their own. The shared call is
+    shielded, so one waiter being cancelled does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._forget(key, future))
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Retrieve the exception so an abandoned failed call is not reported as unhandled
+        if not future.cancelled():
+            future.exception()
+
+    def forget(self, key: Hashable):
+        """
+        Let the next call for key start a new call instead of joining the one in flight
+        """
+        self._inflight.pop(key, None)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,378 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from vosk import KaldiRecognizer, Model
+
+from src.audio_decoding import SAMPLE_RATE, iter_chunks
+from src.stt_worker import init_worker, ping, transcribe_shared
+from src.word_timings import append_result, bytes_to_seconds, empty_columns, extend_columns
+
+logger = logging.getLogger(__name__)
+
+WordColumns = Dict[str, List[Any]]
+
+
+class VoskModelManager:
+    """
+    Keeps one resident Vosk model per language, loaded exactly once
+
+    Loading is guarded by a per-language lock, so concurrent first requests wait
+    for a single load instead of each loading their own copy.
+    """
+
+    def __init__(self, model_paths: Dict[str, str]):
+        self.model_paths = model_paths
+        self._models: Dict[str, Model] = {}
+        self._locks = {language: threading.Lock() for language in model_paths}
+        self.load_ms: Dict[str, int] = {}
+
+    def get(self, language: str) -> Model:
+        model = self._models.get(language)
+        if model is not None:
+            return model
+
+        with self._locks[language]:
+            model = self._models.get(language)
+            if model is None:
+                path = self.model_paths[language]
+                logger.info(f"Loading {language} Vosk model from: {path}")
+                started = time.perf_counter()
+                try:
+                    model = Model(path)
+                except Exception as e:
+                    logger.error(f"Failed to load {language} Vosk model: {str(e)}")
+                    raise RuntimeError(f"Could not load {language} speech recognition model: {str(e)}")
+                self.load_ms[language] = int((time.perf_counter() - started) * 1000)
+                self._models[language] = model
+                logger.info(f"{language} Vosk model loaded in {self.load_ms[language]} ms")
+            return model
+
+    def loaded(self) -> List[str]:
+        return list(self._models)
+
+    def identity(self, language: str) -> str:
+        """
+        Model path plus its modification time, so a model replaced in place gets a new identity
+        """
+        path = self.model_paths[language]
+        try:
+            return f"{os.path.abspath(path)}@{int(os.path.getmtime(path))}"
+        except OSError:
+            return path
+
+
+class RecognizerPool:
+    """
+    Reusable KaldiRecognizers per language
+
+    Recognizers are created ahead of time by prewarm(), handed out by acquire()
+    and Reset() before going back to the pool, so requests never pay for
+    constructing one. At most max_idle recognizers are kept per language.
+
+    Reset() keeps endpointer settings, so recognizers with different endpointing
+    live in different pools; endpointer_delays is applied once, at creation.
+    """
+
+    def __init__(
+        self,
+        models: VoskModelManager,
+        max_idle: int = 4,
+        endpointer_delays: Optional[Tuple[float, float, float]] = None
+    ):
+        """
+        Args:
+            models: Where the Vosk models come from
+            max_idle: Idle recognizers kept per language
+            endpointer_delays: SetEndpointerDelays() arguments, None for the model's defaults
+        """
+        self.models = models
+        self.max_idle = max(1, max_idle)
+        self.endpointer_delays = endpointer_delays
+        self._idle: Dict[str, List[KaldiRecognizer]] = {language: [] for language in models.model_paths}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def prewarm(self, languages: Iterable[str]):
+        for language in languages:
+            recognizers = [self._create(language) for _ in range(self.max_idle)]
+            with self._lock:
+                self._idle[language].extend(recognizers)
+            logger.info(f"Prepared {len(recognizers)} {language} recognizers")
+
+    def _create(self, language: str) -> KaldiRecognizer:
+        recognizer = KaldiRecognizer(self.models.get(language), SAMPLE_RATE)
+        if self.endpointer_delays is not None and hasattr(recognizer, "SetEndpointerDelays"):
+            recognizer.SetEndpointerDelays(*self.endpointer_delays)
+        with self._lock:
+            self.created += 1
+        return recognizer
+
+    @contextmanager
+    def acquire(self, language: str) -> Iterator[KaldiRecognizer]:
+        with self._lock:
+            idle = self._idle[language]
+            recognizer = idle.pop() if idle else None
+            if recognizer is not None:
+                self.reused += 1
+        if recognizer is None:
+            recognizer = self._create(language)
+
+        try:
+            yield recognizer
+        finally:
+            # Clear decoder state so the next user starts from silence, with word output off
+            recognizer.Reset()
+            recognizer.SetWords(False)
+            with self._lock:
+                if len(self._idle[language]) < self.max_idle:
+                    self._idle[language].append(recognizer)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "idle": {language: len(idle) for language, idle in self._idle.items()}
+            }
+
+
+class SpeechRecognizer:
+    """
+    Offline transcription of decoded PCM with pooled recognizers
+
+    In "thread" mode recognitions run on a dedicated thread pool sized to
+    concurrency_per_core jobs per CPU core. In "process" mode they run in a pool
+    of worker processes, each holding its own resident Vosk models, so decoding
+    never competes with the event loop for the GIL; the PCM is handed over
+    through shared memory instead of being pickled. Streaming recognition uses its
+    own in-process pool (streaming_pool), whose recognizers close utterances after
+    a short trailing silence, in both modes.
+    """
+
+    def __init__(
+        self,
+        model_paths: Dict[str, str],
+        recognizers_per_language: int = 4,
+        concurrency_per_core: int = 1,
+        executor: str = "thread",
+        process_workers: int = 0,
+        endpoint_silence_seconds: float = 0.3
+    ):
+        """
+        Args:
+            model_paths: Vosk model directory per language
+            recognizers_per_language: Idle recognizers kept per language
+            concurrency_per_core: Concurrent recognitions per CPU core
+            executor: "thread" or "process"
+            process_workers: Worker processes in process mode, 0 for one per core
+            endpoint_silence_seconds: Trailing silence that closes a streamed utterance
+        """
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown speech recognition executor: {executor}")
+
+        self.models = VoskModelManager(model_paths)
+        self.pool = RecognizerPool(self.models, max_idle=recognizers_per_language)
+        self.streaming_pool = RecognizerPool(
+            self.models,
+            max_idle=recognizers_per_language,
+            endpointer_delays=(5.0, endpoint_silence_seconds, 20.0)
+        )
+        # Startup prewarm() state, reported by /ready
+        self.prewarm_status: Dict[str, Any] = {"state": "not_loaded"}
+        self.executor = executor
+        cores = os.cpu_count() or 1
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        if executor == "process":
+            self.max_concurrency = max(1, process_workers or cores)
+            self._process_pool = self._create_process_pool()
+        else:
+            self.max_concurrency = max(1, cores * concurrency_per_core)
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="stt")
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.jobs = 0
+        self.failures = 0
+        self.total_wait_ms = 0.0
+        self.total_decode_ms = 0.0
+        self.max_decode_ms = 0.0
+
+    def _create_process_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_concurrency,
+            initializer=init_worker,
+            initargs=(dict(self.models.model_paths), tuple(self.models.model_paths))
+        )
+
+    def transcribe_pcm(self, language: str, pcm: bytes) -> str:
+        return self._decode(language, pcm)[0]
+
+    def _decode(self, language: str, pcm: bytes, words: bool = False) -> Tuple[str, Optional[WordColumns], float]:
+        started = time.perf_counter()
+        columns = empty_columns() if words else None
+        segments = []
+        with self.pool.acquire(language) as recognizer:
+            recognizer.SetWords(words)
+            for chunk in iter_chunks(pcm):
+                # A completed utterance must be collected here, FinalResult() only holds the last one
+                if recognizer.AcceptWaveform(chunk):
+                    segments.append(_parse_result(recognizer.Result(), columns))
+            segments.append(_parse_result(recognizer.FinalResult(), columns))
+        text = " ".join(segment for segment in segments if segment)
+        return text, columns, (time.perf_counter() - started) * 1000
+
+    async def transcribe(self, language: str, pcm: bytes) -> str:
+        """
+        Transcribe 16 kHz mono s16le PCM on the configured executor
+
+        Raises:
+            RuntimeError: If the model cannot be loaded or a worker process died
+        """
+        return (await self._run(language, pcm, words=False))[0]
+
+    async def transcribe_words(self, language: str, pcm: bytes) -> Tuple[str, WordColumns]:
+        """
+        Transcribe PCM and return per-word timings as parallel arrays
+
+        Returns:
+            (text, {"word": [...], "start": [...], "end": [...], "conf": [...]}), times in seconds
+        """
+        return await self._run(language, pcm, words=True)
+
+    async def _run(self, language: str, pcm: bytes, words: bool) -> Tuple[str, Optional[WordColumns]]:
+        if not pcm:
+            return "", empty_columns() if words else None
+
+        loop = asyncio.get_event_loop()
+        with self._lock:
+            self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            if self._process_pool is not None:
+                text, columns, decode_ms = await self._transcribe_in_process_pool(language, pcm, words)
+            else:
+                text, columns, decode_ms = await loop.run_in_executor(
+                    self._thread_pool, self._decode, language, pcm, words
+                )
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        total_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.jobs += 1
+            self.total_decode_ms += decode_ms
+            self.total_wait_ms += max(0.0, total_ms - decode_ms)
+            self.max_decode_ms = max(self.max_decode_ms, decode_ms)
+        return text, columns
+
+    async def _transcribe_in_process_pool(self, language: str, pcm: bytes, words: bool) -> Tuple[str, Optional[WordColumns], float]:
+        shm = shared_memory.SharedMemory(create=True, size=len(pcm))
+        try:
+            shm.buf[:len(pcm)] = pcm
+            pool = self._process_pool
+            try:
+                return await asyncio.wrap_future(pool.submit(transcribe_shared, language, shm.name, len(pcm), words))
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); replace the pool so later requests recover
+                logger.error("Speech recognition worker process died, restarting the pool")
+                if self._process_pool is pool:
+                    self._process_pool = self._create_process_pool()
+                    pool.shutdown(wait=False)
+                raise RuntimeError("Speech recognition worker process died")
+        finally:
+            shm.close()
+            shm.unlink()
+
+    async def transcribe_segments(self, language: str, segments: List[bytes]) -> str:
+        """
+        Transcribe the speech segments of one recording concurrently and join them in order
+        """
+        texts = await asyncio.gather(*(self.transcribe(language, segment) for segment in segments))
+        return " ".join(text for text in texts if text)
+
+    async def transcribe_segments_words(
+        self,
+        language: str,
+        segments: List[bytes],
+        offsets: List[int]
+    ) -> Tuple[str, WordColumns]:
+        """
+        Like transcribe_segments(), with word timings merged into one set of columns
+
+        Args:
+            language: Model language
+            segments: Speech segments of one recording, in order
+            offsets: Byte offset of each segment in the original recording,
+                so word times stay relative to the start of the upload
+        """
+        results = await asyncio.gather(*(self.transcribe_words(language, segment) for segment in segments))
+        columns = empty_columns()
+        for (_, segment_columns), offset in zip(results, offsets):
+            extend_columns(columns, segment_columns, bytes_to_seconds(offset))
+        return " ".join(text for text, _ in results if text), columns
+
+    def prewarm(self, languages: Iterable[str]):
+        languages = [language for language in languages if language in self.models.model_paths]
+        self.prewarm_status = {"state": "loading"}
+        try:
+            if self._process_pool is not None:
+                # Start every worker now so their initializers load the models before the first request
+                futures = [self._process_pool.submit(ping) for _ in range(self.max_concurrency)]
+                pids = {future.result() for future in futures}
+                logger.info(f"Started {len(pids)} speech recognition worker processes")
+            for language in languages:
+                self.models.get(language)
+            self.pool.prewarm(languages)
+            self.streaming_pool.prewarm(languages)
+        except Exception as e:
+            self.prewarm_status = {"state": "failed", "error": str(e)}
+            raise
+        self.prewarm_status = {"state": "ready", "languages": languages}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            jobs = self.jobs
+            return {
+                "executor": self.executor,
+                "models_loaded": self.models.loaded(),
+                "model_load_ms": dict(self.models.load_ms),
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.max_concurrency),
+                "jobs": jobs,
+                "failures": self.failures,
+                "avg_wait_ms": round(self.total_wait_ms / jobs, 2) if jobs else 0.0,
+                "avg_decode_ms": round(self.total_decode_ms / jobs, 2) if jobs else 0.0,
+                "max_decode_ms": round(self.max_decode_ms, 2),
+                "recognizers": self.pool.stats(),
+                "streaming_recognizers": self.streaming_pool.stats()
+            }
+
+    def shutdown(self):
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_result(raw: str, columns: Optional[WordColumns]) -> str:
+    result = json.loads(raw)
+    if columns is not None:
+        append_result(columns, result)
+    return result.get("text", "")
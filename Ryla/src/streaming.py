@@ -0,0 +1,60 @@
+from transformers import StoppingCriteria, StoppingCriteriaList, TextStreamer
+from typing import Any, AsyncIterator
+import asyncio
+
+import torch
+
+
+class AsyncTextStreamer(TextStreamer):
+    """
+    Bridges tokens decoded by generate() on a worker thread into an asyncio queue
+
+    generate() calls put()/end() from the inference thread; every finalized piece of
+    text is handed to the event loop with call_soon_threadsafe, so the consumer can
+    simply `async for` over the streamer.
+    """
+
+    _END = object()
+
+    def __init__(self, tokenizer: Any, loop: asyncio.AbstractEventLoop, **decode_kwargs):
+        # skip_prompt drops the decoder start token generate() emits first
+        super().__init__(tokenizer, skip_prompt=True, **decode_kwargs)
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.cancelled = False
+
+    def on_finalized_text(self, text: str, stream_end: bool = False):
+        if text:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, text)
+        if stream_end:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, self._END)
+
+    def finish(self):
+        """
+        End the stream from the event loop, e.g. when generate() failed before end()
+        """
+        self.queue.put_nowait(self._END)
+
+    def cancel(self):
+        """
+        Ask the running generate() to stop at its next decoding step
+        """
+        self.cancelled = True
+
+    def stopping_criteria(self) -> StoppingCriteriaList:
+        return StoppingCriteriaList([_CancelledCriteria(self)])
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while True:
+            text = await self.queue.get()
+            if text is self._END:
+                return
+            yield text
+
+
+class _CancelledCriteria(StoppingCriteria):
+    def __init__(self, streamer: AsyncTextStreamer):
+        self.streamer = streamer
+
+    def __call__(self, input_ids, scores, **kwargs) -> torch.BoolTensor:
+        return torch.full((input_ids.shape[0],), self.streamer.cancelled, dtype=torch.bool, device=input_ids.device)
@@ -0,0 +1,85 @@
+"""
+Entry points executed inside the speech-to-text worker processes
+
+Each worker process loads its own resident Vosk models once, in init_worker(),
+and keeps one recognizer per language that is Reset() between jobs. Audio is
+read from a shared memory block written by the API process, so PCM buffers are
+never pickled through the pool's pipes.
+"""
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import time
+
+from vosk import KaldiRecognizer, Model, SetLogLevel
+
+from src.audio_decoding import CHUNK_BYTES, SAMPLE_RATE
+from src.word_timings import append_result, empty_columns
+
+_model_paths: Dict[str, str] = {}
+_models: Dict[str, Model] = {}
+_recognizers: Dict[str, KaldiRecognizer] = {}
+
+
+def init_worker(model_paths: Dict[str, str], preload: Tuple[str, ...] = ()):
+    _model_paths.update(model_paths)
+    SetLogLevel(-1)
+    for language in preload:
+        _get_recognizer(language)
+
+
+def _get_recognizer(language: str) -> KaldiRecognizer:
+    recognizer = _recognizers.get(language)
+    if recognizer is None:
+        if language not in _models:
+            _models[language] = Model(_model_paths[language])
+        recognizer = KaldiRecognizer(_models[language], SAMPLE_RATE)
+        _recognizers[language] = recognizer
+    return recognizer
+
+
+def ping() -> int:
+    return os.getpid()
+
+
+def transcribe_shared(
+    language: str,
+    shm_name: str,
+    size: int,
+    words: bool = False
+) -> Tuple[str, Optional[Dict[str, List[Any]]], float]:
+    """
+    Transcribe size bytes of 16 kHz mono s16le PCM held in shared memory block shm_name
+
+    Returns:
+        (text, columnar word timings when words is set, decode time in ms)
+    """
+    started = time.perf_counter()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        view = shm.buf[:size]
+        recognizer = _get_recognizer(language)
+        recognizer.SetWords(words)
+        columns = empty_columns() if words else None
+        segments = []
+        try:
+            for start in range(0, size, CHUNK_BYTES):
+                if recognizer.AcceptWaveform(bytes(view[start:start + CHUNK_BYTES])):
+                    segments.append(_parse(recognizer.Result(), columns))
+            segments.append(_parse(recognizer.FinalResult(), columns))
+        finally:
+            recognizer.Reset()
+            view.release()
+    finally:
+        shm.close()
+
+    text = " ".join(segment for segment in segments if segment)
+    return text, columns, (time.perf_counter() - started) * 1000
+
+
+def _parse(raw: str, columns: Optional[Dict[str, List[Any]]]) -> str:
+    result = json.loads(raw)
+    if columns is not None:
+        append_result(columns, result)
+    return result.get("text", "")
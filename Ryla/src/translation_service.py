@@ -1,106 +1,518 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+import asyncio
 import logging
 import aiohttp
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import traceback
 import urllib.parse
 
+from src.response_cache import ResponseCache, normalize_text
+from src.resilience import CircuitBreaker, LatencyTracker, hedged
+from src.singleflight import SingleFlight
+
+try:
+    from argostranslate import translate as argos_translate
+except ImportError:
+    argos_translate = None
+
+
+class TranslationBackend:
+    """
+    One way of translating text; TranslationService tries its backends in order
+    """
+
+    name = "backend"
+    # Whether slow calls may be raced by a second identical request (remote, idempotent backends)
+    hedge = False
+
+    def supports(self, source_lang: str, target_lang: str) -> bool:
+        return True
+
+    async def translate(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """
+        Returns:
+            Translated text, or None if this backend could not translate it
+        """
+        raise NotImplementedError
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MyMemoryBackend(TranslationBackend):
+    """
+    Remote translations from the MyMemory API
+
+    Requests share one long-lived aiohttp session whose connector keeps TCP/TLS
+    connections to MyMemory alive between calls, caches DNS lookups and bounds
+    the number of concurrent connections. The session is opened by start() and
+    also created lazily on first use.
+    """
+
+    name = "mymemory"
+    hedge = True
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        pool_limit: int = 100,
+        pool_limit_per_host: int = 20,
+        dns_ttl_seconds: int = 300,
+        keepalive_seconds: float = 30,
+        timeout_seconds: float = 10
+    ):
+        """
+        Args:
+            url: MyMemory endpoint, overridable to point at a local stub server
+            pool_limit: Maximum open connections in total
+            pool_limit_per_host: Maximum open connections to one host
+            dns_ttl_seconds: How long resolved addresses are reused
+            keepalive_seconds: How long an idle connection is kept open
+            timeout_seconds: Total timeout of one upstream request
+        """
+        self.url = url or os.getenv("MYMEMORY_URL", "https://api.mymemory.translated.net/get")
+        self.email = os.getenv("MYMEMORY_EMAIL", "")
+        self.pool_limit = pool_limit
+        self.pool_limit_per_host = pool_limit_per_host
+        self.dns_ttl_seconds = dns_ttl_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.sessions_created = 0
+        self.upstream_requests = 0
+
+    async def start(self):
+        """
+        Open the shared HTTP session
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_limit,
+                limit_per_host=self.pool_limit_per_host,
+                ttl_dns_cache=self.dns_ttl_seconds,
+                keepalive_timeout=self.keepalive_seconds
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self.sessions_created += 1
+
+    async def close(self):
+        """
+        Close the shared HTTP session and its pooled connections
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def translate(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        try:
+            lang_pair = f"{source_lang}|{target_lang}"
+
+            params = {
+                "q": text,
+                "langpair": lang_pair
+            }
+
+            if self.email:
+                params["de"] = self.email
+
+            session = await self._get_session()
+            self.upstream_requests += 1
+            async with session.get(self.url, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+
+                    # Quota and request errors also arrive as HTTP 200, with the
+                    # message in translatedText; only responseStatus (sometimes a string) tells them apart
+                    if data and str(data.get("responseStatus")) != "200":
+                        logging.error(f"MyMemory API error: {data.get('responseStatus')} - {data.get('responseDetails')}")
+                        return None
+
+                    if data and "responseData" in data and "translatedText" in data["responseData"]:
+                        translated_text = data["responseData"]["translatedText"]
+
+                        if "match" in data["responseData"]:
+                            match_quality = data["responseData"]["match"]
+                            logging.info(f"MyMemory translation match quality: {match_quality}")
+
+                        return translated_text
+                    else:
+                        logging.warning(f"MyMemory API returned unexpected data structure: {data}")
+                else:
+                    error_response = await response.text()
+                    logging.error(f"MyMemory API error: {response.status} - {error_response}")
+
+            return None
+
+        except aiohttp.ClientError as e:
+            logging.error(f"MyMemory request error: {str(e)}")
+            return None
+        except Exception as e:
+            logging.error(f"MyMemory unexpected error: {str(e)}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "upstream_requests": self.upstream_requests,
+            "sessions_created": self.sessions_created
+        }
+
+
+class ArgosBackend(TranslationBackend):
+    """
+    In-process translations with the Argos Translate models LibreTranslate uses
+
+    Each language pair's translator is built once and kept in memory. Translation
+    is CPU-bound, so it runs on a small dedicated thread pool instead of the event
+    loop. Pairs without an installed Argos package are reported as unsupported so
+    the next backend in the chain handles them.
+    """
+
+    name = "argos"
+
+    def __init__(self, max_workers: int = 2, preload_pairs: Iterable[Tuple[str, str]] = ()):
+        """
+        Args:
+            max_workers: Concurrent translations
+            preload_pairs: (source, target) pairs whose translators are built by start()
+        """
+        self.preload_pairs = list(preload_pairs)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="argos")
+        self._translations: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+        if argos_translate is None:
+            logging.warning("argostranslate is not installed, the argos translation backend is disabled")
+
+    def _get_translation(self, source_lang: str, target_lang: str) -> Optional[Any]:
+        pair = (source_lang, target_lang)
+        if pair in self._translations:
+            return self._translations[pair]
+
+        with self._lock:
+            if pair not in self._translations:
+                translation = None
+                if argos_translate is not None:
+                    languages = {language.code: language for language in argos_translate.get_installed_languages()}
+                    if source_lang in languages and target_lang in languages:
+                        translation = languages[source_lang].get_translation(languages[target_lang])
+                if translation is None:
+                    logging.warning(f"No Argos model installed for {source_lang}->{target_lang}")
+                else:
+                    logging.info(f"Loaded Argos translator for {source_lang}->{target_lang}")
+                self._translations[pair] = translation
+            return self._translations[pair]
+
+    def supports(self, source_lang: str, target_lang: str) -> bool:
+        if argos_translate is None:
+            return False
+        translation = self._translations.get((source_lang, target_lang), False)
+        # Pairs not looked up yet are tried; translate() loads them on first use
+        return translation is not None
+
+    async def start(self):
+        if argos_translate is None or not self.preload_pairs:
+            return
+        loop = asyncio.get_event_loop()
+        for source_lang, target_lang in self.preload_pairs:
+            await loop.run_in_executor(self._executor, self._get_translation, source_lang, target_lang)
+
+    async def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _translate_sync(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        translation = self._get_translation(source_lang, target_lang)
+        if translation is None:
+            return None
+        return translation.translate(text)
+
+    async def translate(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        self.requests += 1
+        try:
+            return await asyncio.get_event_loop().run_in_executor(
+                self._executor, self._translate_sync, text, source_lang, target_lang
+            )
+        except Exception as e:
+            self.failures += 1
+            logging.error(f"Argos translation error: {str(e)}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "loaded_pairs": [f"{source}-{target}" for (source, target), t in self._translations.items() if t is not None]
+        }
+
+
 class TranslationService:
     """
-    Service for handling text translations using only the MyMemory API
+    Service for handling text translations through an ordered chain of backends
+
+    Each request goes to the first backend that supports the language pair; if
+    it fails, the next one is tried. Without explicit backends, MyMemory alone is
+    used. Call start() and close() from the application's startup/shutdown hooks.
+
+    With a translation memory, exact repeats of (source, target, normalized text)
+    are answered from the cache without calling any backend. Only successful
+    backend translations are remembered, never the untranslated fallback.
+    Concurrent requests for the same text and pair share one backend call.
+
+    Every backend sits behind its own circuit breaker: a backend that keeps
+    failing is skipped without waiting for it, and when no backend is available
+    the remembered or original text is returned immediately. Calls to hedgeable
+    backends that run past their recent p95 latency are raced by a second
+    request, and the first answer wins.
     """
 
-    def __init__(self):
-        self.mymemory_url = "https://api.mymemory.translated.net/get"
-        self.mymemory_email = os.getenv("MYMEMORY_EMAIL", "")
-        
-        logging.info(f"Translation service initialized with MyMemory API")
-    
-    async def translate_text(
-        self, 
-        text: str, 
-        source_lang: str, 
-        target_lang: str, 
-        retry_count: int = 0
-    ) -> Optional[str]:
-        """
-        Translate text using the MyMemory API
-        
+    def __init__(
+        self,
+        backends: Optional[List[TranslationBackend]] = None,
+        memory: Optional[ResponseCache] = None,
+        breaker_failure_threshold: int = 5,
+        breaker_reset_seconds: float = 30.0,
+        hedge_percentile: Optional[float] = 95.0,
+        hedge_min_delay_ms: float = 50.0
+    ):
+        """
+        Args:
+            backends: Backends to try, in order
+            memory: Translation memory; None disables it
+            breaker_failure_threshold: Consecutive failures that open a backend's circuit
+            breaker_reset_seconds: How long an open circuit waits before probing the backend
+            hedge_percentile: Latency percentile after which a hedge request is sent, None to disable hedging
+            hedge_min_delay_ms: Lower bound of the hedge delay
+        """
+        self.backends = backends or [MyMemoryBackend()]
+        self.memory = memory
+        self.served: Dict[str, int] = {backend.name: 0 for backend in self.backends}
+        self._inflight = SingleFlight()
+        self.breakers = {
+            backend.name: CircuitBreaker(
+                f"translation:{backend.name}",
+                failure_threshold=breaker_failure_threshold,
+                reset_timeout=breaker_reset_seconds
+            )
+            for backend in self.backends
+        }
+        self.latency = {backend.name: LatencyTracker() for backend in self.backends}
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay_ms = hedge_min_delay_ms
+        self.hedges = 0
+        self.fast_failed = 0
+
+        logging.info(f"Translation service initialized with backends: {', '.join(b.name for b in self.backends)}")
+
+    async def start(self):
+        for backend in self.backends:
+            await backend.start()
+
+    async def close(self):
+        for backend in self.backends:
+            await backend.close()
+
+    async def translate_text(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """
+        Translate text with the first available backend that succeeds
+
         Args:
             text: Text to translate
             source_lang: Source language code (e.g., 'en')
             target_lang: Target language code (e.g., 'fr')
-            retry_count: Internal counter for retry attempts
-            
+
         Returns:
-            Translated text or original text if translation fails
+            Translated text, or the original text if no backend could translate it
         """
         if source_lang == target_lang or not text.strip():
             return text
-            
-        if retry_count >= 2:
-            logging.warning(f"Max retries reached for translation request")
-            return text
-        
+
+        key = ResponseCache.make_key("translation", source_lang, target_lang, normalize_text(text))
+        if self.memory is not None:
+            remembered = self.memory.get(key)
+            if remembered is not None:
+                return remembered
+
         try:
-            translated = await self._translate_with_mymemory(text, source_lang, target_lang)
+            translated = await self._inflight.do(
+                key, lambda: self._translate_with_backends(text, source_lang, target_lang)
+            )
             if translated:
+                if self.memory is not None:
+                    self.memory.put(key, translated)
                 return translated
-            
-            logging.warning(f"MyMemory translation failed, returning original text")
+
+            logging.warning(f"All translation backends failed or unavailable, returning original text")
             return text
-            
+
         except Exception as e:
             error_id = datetime.utcnow().strftime('%Y%m%d%H%M%S')
             logging.error(f"Translation error ID: {error_id}\n{str(e)}\n{traceback.format_exc()}")
-            
-            if retry_count < 1:
-                logging.info(f"Retrying translation after error")
-                return await self.translate_text(text, source_lang, target_lang, retry_count + 1)
-            
             return text
-    
-    async def _translate_with_mymemory(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
-        try:
-            lang_pair = f"{source_lang}|{target_lang}"
-            
-            params = {
-                "q": text,
-                "langpair": lang_pair
-            }
-            
-            if self.mymemory_email:
-                params["de"] = self.mymemory_email
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    self.mymemory_url,
-                    params=params,
-                    timeout=10
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        if data and "responseData" in data and "translatedText" in data["responseData"]:
-                            translated_text = data["responseData"]["translatedText"]
-                            
-                            if "match" in data["responseData"]:
-                                match_quality = data["responseData"]["match"]
-                                logging.info(f"MyMemory translation match quality: {match_quality}")
-                            
-                            return translated_text
-                        else:
-                            logging.warning(f"MyMemory API returned unexpected data structure: {data}")
-                    else:
-                        error_response = await response.text()
-                        logging.error(f"MyMemory API error: {response.status} - {error_response}")
-                        
+
+    async def _translate_with_backends(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        attempted = False
+        for backend in self.backends:
+            if not backend.supports(source_lang, target_lang):
+                continue
+            breaker = self.breakers[backend.name]
+            if not breaker.allow_request():
+                continue
+            attempted = True
+
+            try:
+                translated = await hedged(
+                    lambda: self._timed_translate(backend, text, source_lang, target_lang),
+                    self._hedge_delay(backend),
+                    on_hedge=self._count_hedge
+                )
+            except asyncio.CancelledError:
+                # No outcome to report; a half-open circuit must not keep the probe slot forever
+                breaker.record_cancelled()
+                raise
+            except Exception as e:
+                logging.error(f"{backend.name} translation error: {str(e)}")
+                translated = None
+
+            if translated:
+                breaker.record_success()
+                self.served[backend.name] += 1
+                return translated
+            breaker.record_failure()
+            logging.info(f"{backend.name} could not translate {source_lang}->{target_lang}, trying next backend")
+
+        if not attempted:
+            # Every circuit is open: answer now instead of waiting on failing backends
+            self.fast_failed += 1
+        return None
+
+    async def _timed_translate(self, backend: TranslationBackend, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        started = time.perf_counter()
+        translated = await backend.translate(text, source_lang, target_lang)
+        if translated:
+            self.latency[backend.name].record((time.perf_counter() - started) * 1000)
+        return translated
+
+    def _hedge_delay(self, backend: TranslationBackend) -> Optional[float]:
+        if not backend.hedge or self.hedge_percentile is None:
             return None
-            
-        except aiohttp.ClientError as e:
-            logging.error(f"MyMemory request error: {str(e)}")
+        threshold = self.latency[backend.name].percentile(self.hedge_percentile)
+        if threshold is None:
             return None
-        except Exception as e:
-            logging.error(f"MyMemory unexpected error: {str(e)}")
-            return None
\ No newline at end of file
+        return max(threshold, self.hedge_min_delay_ms) / 1000
+
+    def _count_hedge(self):
+        self.hedges += 1
+
+    async def translate_batch(
+        self,
+        texts: List[str],
+        source_lang: str,
+        target_lang: str,
+        concurrency: int = 8
+    ) -> List[str]:
+        """
+        Translate many texts, each distinct text once
+
+        Identical entries (after whitespace normalization) are translated once and
+        at most `concurrency` translations run at a time.
+
+        Returns:
+            Translations in the order of texts; untranslatable entries are returned unchanged
+        """
+        unique: Dict[str, str] = {}
+        for text in texts:
+            if text.strip():
+                unique.setdefault(normalize_text(text), text)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def translate_one(text: str) -> str:
+            async with semaphore:
+                return await self.translate_text(text, source_lang, target_lang)
+
+        results = await asyncio.gather(*(translate_one(text) for text in unique.values()))
+        translated = dict(zip(unique, results))
+        return [translated[normalize_text(text)] if text.strip() else text for text in texts]
+
+    async def prewarm(self, phrases: Iterable[str], pairs: Iterable[Tuple[str, str]], concurrency: int = 4) -> int:
+        """
+        Fill the translation memory with phrases not remembered yet
+
+        Args:
+            phrases: Texts to translate, e.g. UI strings and common learner phrases
+            pairs: (source, target) language pairs to translate each phrase into
+            concurrency: Translations in flight at once
+
+        Returns:
+            Number of phrases translated by a backend
+        """
+        if self.memory is None:
+            return 0
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        translated = 0
+
+        async def warm(text: str, source_lang: str, target_lang: str):
+            nonlocal translated
+            key = ResponseCache.make_key("translation", source_lang, target_lang, normalize_text(text))
+            if self.memory.get(key) is not None:
+                return
+            async with semaphore:
+                result = await self._translate_with_backends(text, source_lang, target_lang)
+            if result:
+                self.memory.put(key, result)
+                translated += 1
+
+        unique = {normalize_text(text): text for text in phrases if text.strip()}
+        pairs = [(source_lang, target_lang) for source_lang, target_lang in pairs if source_lang != target_lang]
+        await asyncio.gather(*(
+            warm(text, source_lang, target_lang)
+            for text in unique.values()
+            for source_lang, target_lang in pairs
+        ))
+        logging.info(f"Translation memory prewarmed with {translated} new translations")
+        return translated
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats() if self.memory is not None else None
+        if memory is not None:
+            # Every memory hit is a backend call that did not happen
+            memory["saved_upstream_calls"] = memory["hits"]
+        return {
+            "served": dict(self.served),
+            "coalesced_requests": self._inflight.shared,
+            "hedged_requests": self.hedges,
+            "fast_failed": self.fast_failed,
+            "memory": memory,
+            "backends": {
+                backend.name: {
+                    **backend.stats(),
+                    "circuit": self.breakers[backend.name].stats(),
+                    "latency": self.latency[backend.name].stats()
+                }
+                for backend in self.backends
+            }
+        }
+
+
+def load_phrases(path: str) -> List[str]:
+    """
+    Read a phrase list, one phrase per line; blank lines and lines starting with # are skipped
+    """
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
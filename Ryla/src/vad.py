@@ -0,0 +1,243 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import threading
+
+import numpy as np
+
+from src.audio_decoding import SAMPLE_RATE
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+logger = logging.getLogger(__name__)
+
+VAD_MODES = ("off", "energy", "webrtc")
+
+
+class VadResult:
+    """
+    Speech segments cut out of one recording, and how much audio was dropped
+    """
+
+    def __init__(self, segments: List[bytes], input_bytes: int, offsets: Optional[List[int]] = None):
+        """
+        Args:
+            segments: Speech segments, in order
+            input_bytes: Size of the whole recording
+            offsets: Byte offset of each segment within the recording
+        """
+        self.segments = segments
+        self.input_bytes = input_bytes
+        self.offsets = offsets if offsets is not None else [0] * len(segments)
+        self.speech_bytes = sum(len(segment) for segment in segments)
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.input_bytes - self.speech_bytes
+
+    @property
+    def speech_ratio(self) -> float:
+        return round(self.speech_bytes / self.input_bytes, 3) if self.input_bytes else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "segments": len(self.segments),
+            "speech_ratio": self.speech_ratio,
+            "bytes_saved": self.bytes_saved
+        }
+
+
+class VoiceActivityDetector:
+    """
+    Trims silence from 16 kHz mono s16le PCM and splits it into speech segments
+
+    Frames are classified as speech either by energy (above an adaptive noise floor)
+    or, when webrtcvad is installed and mode="webrtc", by WebRTC's VAD. Speech frames
+    are padded on both sides so word onsets and tails survive. Speech separated by
+    pauses shorter than merge_gap_ms stays in one segment (as long as it fits in
+    max_segment_seconds), longer pauses are dropped, and segments longer than
+    max_segment_seconds are cut at their quietest frame so long recordings decode
+    in parallel.
+    """
+
+    def __init__(
+        self,
+        mode: str = "energy",
+        frame_ms: int = 30,
+        padding_ms: int = 300,
+        min_speech_ms: int = 150,
+        merge_gap_ms: int = 1000,
+        max_segment_seconds: float = 15.0,
+        energy_margin_db: float = 6.0,
+        min_energy_db: float = -50.0,
+        aggressiveness: int = 2,
+        sample_rate: int = SAMPLE_RATE
+    ):
+        """
+        Args:
+            mode: "off", "energy" or "webrtc" (falls back to energy without webrtcvad)
+            frame_ms: Analysis frame length; webrtc accepts 10, 20 or 30
+            padding_ms: Audio kept around every speech frame
+            min_speech_ms: Shorter bursts (clicks, taps) are dropped
+            merge_gap_ms: Pauses up to this long are kept inside a segment
+            max_segment_seconds: Longest segment handed to one recognizer
+            energy_margin_db: How far above the noise floor a frame counts as speech
+            min_energy_db: Frames quieter than this (dBFS) are never speech
+            aggressiveness: webrtcvad aggressiveness, 0-3
+            sample_rate: Sample rate of the PCM
+        """
+        if mode not in VAD_MODES:
+            raise ValueError(f"Unknown VAD mode: {mode}")
+        if mode == "webrtc" and webrtcvad is None:
+            logger.warning("webrtcvad is not installed, using the energy VAD")
+            mode = "energy"
+
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.frame_bytes = sample_rate * frame_ms // 1000 * 2
+        self.padding_frames = max(0, padding_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.merge_gap_frames = max(0, merge_gap_ms // frame_ms)
+        self.max_segment_frames = max(1, int(max_segment_seconds * 1000 // frame_ms))
+        self.energy_margin_db = energy_margin_db
+        self.min_energy_db = min_energy_db
+        self.aggressiveness = aggressiveness
+        self._webrtc = webrtcvad.Vad(aggressiveness) if mode == "webrtc" else None
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.fallbacks = 0
+        self.input_bytes = 0
+        self.bytes_saved = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def config(self) -> Dict[str, Any]:
+        """
+        Every parameter that affects split(), e.g. for keys of cached transcripts
+        """
+        return {
+            "mode": self.mode,
+            "sample_rate": self.sample_rate,
+            "frame_bytes": self.frame_bytes,
+            "padding_frames": self.padding_frames,
+            "min_speech_frames": self.min_speech_frames,
+            "merge_gap_frames": self.merge_gap_frames,
+            "max_segment_frames": self.max_segment_frames,
+            "energy_margin_db": self.energy_margin_db,
+            "min_energy_db": self.min_energy_db,
+            "aggressiveness": self.aggressiveness if self.mode == "webrtc" else None
+        }
+
+    def split(self, pcm: bytes) -> VadResult:
+        """
+        Cut the speech out of a recording
+
+        When no speech is found, or the energy VAD cannot tell speech from the
+        background (noisy or gapless recordings), the whole recording is returned as
+        one segment: decoding silence costs little, dropping speech loses the transcript.
+
+        Returns:
+            The speech segments in order, covering the whole recording when unsure
+        """
+        fallback = False
+        if not self.enabled or len(pcm) < self.frame_bytes:
+            spans = [(0, len(pcm))] if pcm else []
+        else:
+            flags, energy_db = self._classify(pcm)
+            spans = self._segments(flags, energy_db, len(pcm)) if flags is not None else []
+            if not spans:
+                spans = [(0, len(pcm))]
+                fallback = True
+        result = VadResult([pcm[start:end] for start, end in spans], len(pcm), [start for start, _ in spans])
+
+        with self._lock:
+            self.requests += 1
+            self.fallbacks += fallback
+            self.input_bytes += result.input_bytes
+            self.bytes_saved += result.bytes_saved
+        return result
+
+    def _classify(self, pcm: bytes) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        Per-frame speech flags and energies in dBFS
+
+        Flags are None when the energy VAD has no usable noise floor, i.e. the
+        typical frame is not clearly louder than the quietest ones.
+        """
+        frame_count = len(pcm) // self.frame_bytes
+        samples = np.frombuffer(pcm, dtype=np.int16, count=frame_count * self.frame_bytes // 2)
+        frames = samples.reshape(frame_count, -1).astype(np.float32) / 32768.0
+        energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+        if self._webrtc is not None:
+            flags = np.array([
+                self._webrtc.is_speech(pcm[i * self.frame_bytes:(i + 1) * self.frame_bytes], self.sample_rate)
+                for i in range(frame_count)
+            ], dtype=bool)
+        else:
+            # The quietest tenth of the recording approximates its background noise, unless
+            # the loud frames are barely above it: then the "floor" is speech itself (gapless
+            # recordings) or the speech is buried in noise, and no frame can be trusted
+            noise_floor, loud = np.percentile(energy_db, [10, 90])
+            if loud - noise_floor < self.energy_margin_db:
+                return None, energy_db
+            flags = energy_db > max(self.min_energy_db, noise_floor + self.energy_margin_db)
+        return flags, energy_db
+
+    def _segments(self, flags: np.ndarray, energy_db: np.ndarray, total_bytes: int) -> List[Tuple[int, int]]:
+        # Drop isolated bursts before padding so clicks do not pull silence back in
+        speech = np.zeros_like(flags)
+        for start, end in _runs(flags):
+            if end - start >= self.min_speech_frames:
+                speech[start:end] = True
+
+        if self.padding_frames and speech.any():
+            kernel = np.ones(2 * self.padding_frames + 1)
+            speech = np.convolve(speech.astype(np.float32), kernel, mode="same") > 0
+
+        # Rejoin utterances split by short pauses; Vosk decodes better with the context
+        spans: List[Tuple[int, int]] = []
+        for start, end in _runs(speech):
+            if spans and start - spans[-1][1] <= self.merge_gap_frames and end - spans[-1][0] <= self.max_segment_frames:
+                spans[-1] = (spans[-1][0], end)
+            else:
+                spans.append((start, end))
+
+        segments = []
+        last_frame = len(flags)
+        for start, end in spans:
+            while end - start > self.max_segment_frames:
+                # Cut in the quietest frame of the window's last third, most likely a gap between words
+                search_from = start + self.max_segment_frames * 2 // 3
+                cut = search_from + int(np.argmin(energy_db[search_from:start + self.max_segment_frames])) + 1
+                segments.append((start * self.frame_bytes, cut * self.frame_bytes))
+                start = cut
+            # The partial frame at the end of the buffer belongs to a segment reaching it
+            end_byte = total_bytes if end == last_frame else end * self.frame_bytes
+            segments.append((start * self.frame_bytes, end_byte))
+        return segments
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "requests": self.requests,
+                "input_bytes": self.input_bytes,
+                "bytes_saved": self.bytes_saved,
+                "fallbacks": self.fallbacks,
+                "speech_ratio": round(1 - self.bytes_saved / self.input_bytes, 3) if self.input_bytes else 0.0
+            }
+
+
+def _runs(flags: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    (start, end) frame indices of every run of True values
+    """
+    padded = np.concatenate(([False], flags, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return [(int(start), int(end)) for start, end in zip(edges[::2], edges[1::2])]
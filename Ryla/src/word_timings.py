@@ -0,0 +1,51 @@
+from typing import Any, Dict, List
+
+from src.audio_decoding import SAMPLE_RATE
+
+WORD_FIELDS = ("word", "start", "end", "conf")
+
+
+def empty_columns() -> Dict[str, List[Any]]:
+    """
+    Columnar word timings: parallel arrays instead of one dict per word
+    """
+    return {field: [] for field in WORD_FIELDS}
+
+
+def append_result(columns: Dict[str, List[Any]], result: Dict[str, Any], offset_seconds: float = 0.0):
+    """
+    Append the words of one Vosk Result()/FinalResult() (recognizer.SetWords(True))
+
+    Args:
+        columns: Columns to extend in place
+        result: Parsed recognizer result
+        offset_seconds: Start of the decoded audio within the whole recording
+    """
+    words = result.get("result")
+    if not words:
+        return
+    columns["word"].extend(item["word"] for item in words)
+    columns["start"].extend(round(item["start"] + offset_seconds, 2) for item in words)
+    columns["end"].extend(round(item["end"] + offset_seconds, 2) for item in words)
+    columns["conf"].extend(round(item.get("conf", 1.0), 3) for item in words)
+
+
+def extend_columns(columns: Dict[str, List[Any]], other: Dict[str, List[Any]], offset_seconds: float = 0.0):
+    """
+    Append another set of columns, shifting its timestamps by offset_seconds
+    """
+    columns["word"].extend(other["word"])
+    if offset_seconds:
+        columns["start"].extend(round(start + offset_seconds, 2) for start in other["start"])
+        columns["end"].extend(round(end + offset_seconds, 2) for end in other["end"])
+    else:
+        columns["start"].extend(other["start"])
+        columns["end"].extend(other["end"])
+    columns["conf"].extend(other["conf"])
+
+
+def bytes_to_seconds(byte_offset: int, sample_rate: int = SAMPLE_RATE) -> float:
+    """
+    Position in seconds of a byte offset into 16-bit mono PCM
+    """
+    return byte_offset / (2 * sample_rate)
@@ -0,0 +1,42 @@
+from src.generation_policy import GenerationPolicy
+
+
+def test_fixed_budget_ignores_input_length():
+    policy = GenerationPolicy("response", max_beams=4)
+    assert policy.params(3, budget=150)['max_new_tokens'] == 150
+    assert policy.params(200, budget=50)['max_new_tokens'] == 50
+
+
+def test_budget_scales_with_input_length():
+    policy = GenerationPolicy("grammar", max_beams=5, length_ratio=1.5, min_new_tokens=16, max_new_tokens=512)
+    assert policy.params(4)['max_new_tokens'] == 16
+    assert policy.params(100)['max_new_tokens'] == 150
+    assert policy.params(1000)['max_new_tokens'] == 512
+
+
+def test_sampling_uses_a_single_beam():
+    params = GenerationPolicy("response", max_beams=4).params(10, temperature=0.6)
+    assert params['num_beams'] == 1 and params['do_sample']
+    assert 'early_stopping' not in params
+
+
+def test_beams_step_down_over_slo_and_back_up():
+    policy = GenerationPolicy("grammar", max_beams=5, latency_slo_ms=100, cooldown=1)
+    for _ in range(20):
+        policy.record(10, 300, policy.params(10)['num_beams'])
+    assert policy.params(10)['num_beams'] == 1
+    assert not policy.at_full_width(policy.params(10))
+    # Other buckets are unaffected
+    assert policy.params(200)['num_beams'] == 5
+
+    for _ in range(50):
+        beams = policy.params(10)['num_beams']
+        policy.record(10, 10 * beams, beams)
+    assert policy.params(10)['num_beams'] == 5
+    assert policy.at_full_width(policy.params(10))
+
+
+def test_samples_at_another_width_are_ignored():
+    policy = GenerationPolicy("response", max_beams=4, latency_slo_ms=100, cooldown=1)
+    policy.record(10, 10000, beams=1)
+    assert policy.stats()["buckets"]["<=16"]["samples"] == 0
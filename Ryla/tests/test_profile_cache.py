@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from src.profile_cache import InMemoryProfileBackend, UserProfileCache
+
+
+class SlowBackend(InMemoryProfileBackend):
+    """
+    Reads take read_delay seconds, returning the profile as it was when the read started
+    """
+
+    def __init__(self, profiles, read_delay=0.2):
+        super().__init__(profiles)
+        self.read_delay = read_delay
+
+    def get(self, user_id):
+        data = super().get(user_id)
+        time.sleep(self.read_delay)
+        return data
+
+
+def test_invalidation_during_read_is_not_overwritten():
+    async def scenario():
+        backend = SlowBackend({"u1": {"lang_to_learn": "en"}})
+        cache = UserProfileCache(backend, ttl_seconds=300)
+        read = asyncio.ensure_future(cache.get("u1"))
+        await asyncio.sleep(0.05)
+        # A remote change arrives while the read is still running
+        InMemoryProfileBackend.set(backend, "u1", {"lang_to_learn": "fr"})
+        cache.invalidate("u1")
+        assert (await read)["lang_to_learn"] == "en"
+        return await cache.get("u1")
+
+    assert asyncio.run(scenario())["lang_to_learn"] == "fr"
+
+
+def test_put_during_read_is_not_overwritten():
+    async def scenario():
+        backend = SlowBackend({"u1": {"x": 1}})
+        cache = UserProfileCache(backend, ttl_seconds=300)
+        read = asyncio.ensure_future(cache.get("u1"))
+        await asyncio.sleep(0.05)
+        await cache.put("u1", {"x": 2})
+        await read
+        return await cache.get("u1"), cache.stats()
+
+    profile, stats = asyncio.run(scenario())
+    assert profile == {"x": 2}
+    assert stats["stale_reads"] == 1
+
+
+def test_cache_is_bounded_and_expires():
+    async def scenario():
+        backend = InMemoryProfileBackend({f"u{i}": {"i": i} for i in range(50)})
+        cache = UserProfileCache(backend, ttl_seconds=0.05, max_entries=10)
+        for i in range(50):
+            await cache.get(f"u{i}")
+        bounded = cache.stats()["entries"]
+        await asyncio.sleep(0.1)
+        await cache.get("u0")
+        return bounded, cache.stats()
+
+    bounded, stats = asyncio.run(scenario())
+    assert bounded == 10
+    assert stats["entries"] == 1
+    assert not stats["stale_reads"]
@@ -0,0 +1,148 @@
+import asyncio
+
+from aiohttp import web
+
+from src.response_cache import ResponseCache
+from src.translation_service import MyMemoryBackend, TranslationService
+
+
+class StubMyMemory:
+    """
+    Local stand-in for the MyMemory /get endpoint
+
+    Answers "<target>:<q>" after delay seconds, or the quota warning MyMemory sends
+    as HTTP 200 with responseStatus 429 when quota_exceeded is set.
+    """
+
+    def __init__(self, delay: float = 0.0, quota_exceeded: bool = False):
+        self.delay = delay
+        self.quota_exceeded = quota_exceeded
+        self.queries = []
+        self.peers = set()
+        self._runner = None
+        self.url = None
+
+    async def handle(self, request):
+        self.queries.append(request.query["q"])
+        self.peers.add(request.transport.get_extra_info("peername"))
+        await asyncio.sleep(self.delay)
+        if self.quota_exceeded:
+            return web.json_response({
+                "responseData": {"translatedText": "MYMEMORY WARNING: YOU USED ALL AVAILABLE FREE TRANSLATIONS FOR TODAY"},
+                "responseStatus": 429,
+                "responseDetails": "quota exceeded"
+            })
+        target = request.query["langpair"].split("|")[1]
+        return web.json_response({
+            "responseData": {"translatedText": f"{target}:{request.query['q']}", "match": 1},
+            "responseStatus": 200
+        })
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/get", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/get"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+
+def _service(stub, **kwargs):
+    kwargs.setdefault("hedge_percentile", None)
+    return TranslationService([MyMemoryBackend(url=stub.url)], **kwargs)
+
+
+def test_requests_reuse_one_session_and_connection():
+    async def scenario():
+        async with StubMyMemory() as stub:
+            service = _service(stub)
+            await service.start()
+            try:
+                results = [await service.translate_text(f"hello {i}", "en", "fr") for i in range(5)]
+            finally:
+                await service.close()
+            return results, stub, service.stats()
+
+    results, stub, stats = asyncio.run(scenario())
+    assert results == [f"fr:hello {i}" for i in range(5)]
+    assert len(stub.queries) == 5
+    assert len(stub.peers) == 1
+    assert stats["backends"]["mymemory"]["sessions_created"] == 1
+
+
+def test_quota_warning_is_a_failure_and_not_remembered():
+    async def scenario():
+        async with StubMyMemory(quota_exceeded=True) as stub:
+            service = _service(stub, memory=ResponseCache(max_entries=16, ttl_seconds=None))
+            try:
+                first = await service.translate_text("good morning", "en", "fr")
+                second = await service.translate_text("good morning", "en", "fr")
+            finally:
+                await service.close()
+            return first, second, stub, service.stats()
+
+    first, second, stub, stats = asyncio.run(scenario())
+    # The original text comes back and the second call goes upstream again
+    assert first == second == "good morning"
+    assert len(stub.queries) == 2
+    assert stats["memory"]["entries"] == 0
+    assert stats["backends"]["mymemory"]["circuit"]["consecutive_failures"] == 2
+
+
+def test_open_circuit_fails_fast():
+    async def scenario():
+        async with StubMyMemory(quota_exceeded=True) as stub:
+            service = _service(stub, breaker_failure_threshold=2, breaker_reset_seconds=60)
+            try:
+                for i in range(5):
+                    assert await service.translate_text(f"text {i}", "en", "fr") == f"text {i}"
+            finally:
+                await service.close()
+            return stub, service.stats()
+
+    stub, stats = asyncio.run(scenario())
+    assert len(stub.queries) == 2
+    assert stats["backends"]["mymemory"]["circuit"]["state"] == "open"
+    assert stats["fast_failed"] == 3
+
+
+def test_batch_translates_each_distinct_text_once():
+    async def scenario():
+        async with StubMyMemory(delay=0.05) as stub:
+            service = _service(stub)
+            try:
+                texts = ["hi", "thanks", " hi ", "", "thanks", "bye"]
+                translated = await service.translate_batch(texts, "en", "fr")
+            finally:
+                await service.close()
+            return texts, translated, stub
+
+    texts, translated, stub = asyncio.run(scenario())
+    assert translated == ["fr:hi", "fr:thanks", "fr:hi", "", "fr:thanks", "fr:bye"]
+    assert sorted(stub.queries) == ["bye", "hi", "thanks"]
+
+
+def test_concurrent_requests_share_one_upstream_call():
+    async def scenario():
+        async with StubMyMemory(delay=0.1) as stub:
+            service = _service(stub)
+            try:
+                results = await asyncio.gather(
+                    service.translate_batch(["where is the station"], "en", "fr"),
+                    service.translate_text("where is the station", "en", "fr"),
+                    service.translate_text("  where is the station ", "en", "fr")
+                )
+            finally:
+                await service.close()
+            return results, stub, service.stats()
+
+    results, stub, stats = asyncio.run(scenario())
+    assert results[0] == ["fr:where is the station"]
+    assert len(stub.queries) == 1
+    assert stats["coalesced_requests"] == 2
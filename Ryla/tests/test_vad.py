@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from src.audio_decoding import SAMPLE_RATE
+from src.vad import VoiceActivityDetector
+
+
+def _speech(seconds, rng):
+    """
+    Speech-like signal: a voiced carrier modulated at syllable rate
+    """
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    carrier = np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t) + 0.3 * rng.standard_normal(len(t))
+    envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4 * t)
+    return 0.3 * carrier * envelope
+
+
+def _pcm(signal):
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def _clip(lead, speech, tail, snr_db, seed=0):
+    rng = np.random.default_rng(seed)
+    voice = np.concatenate([np.zeros(int(lead * SAMPLE_RATE)), _speech(speech, rng), np.zeros(int(tail * SAMPLE_RATE))])
+    if snr_db is None:
+        return _pcm(voice)
+    speech_power = np.mean(_speech(speech, rng) ** 2)
+    noise = rng.standard_normal(len(voice)) * np.sqrt(speech_power / 10 ** (snr_db / 10))
+    return _pcm(voice + noise)
+
+
+def _covered_seconds(result, start, end):
+    """
+    Seconds of [start, end) covered by the returned segments
+    """
+    covered = 0
+    for offset, segment in zip(result.offsets, result.segments):
+        seg_start = offset / (2 * SAMPLE_RATE)
+        seg_end = seg_start + len(segment) / (2 * SAMPLE_RATE)
+        covered += max(0.0, min(end, seg_end) - max(start, seg_start))
+    return covered
+
+
+def test_clean_clip_trims_silence():
+    result = VoiceActivityDetector().split(_clip(1, 3, 1, snr_db=None))
+    assert result.segments
+    assert _covered_seconds(result, 1, 4) > 2.9
+    assert result.bytes_saved > 0
+
+
+@pytest.mark.parametrize("snr_db", [3, 7, 10.6, 20])
+def test_noisy_clip_keeps_speech(snr_db):
+    result = VoiceActivityDetector().split(_clip(1, 3, 1, snr_db=snr_db))
+    assert _covered_seconds(result, 1, 4) > 2.9
+
+
+@pytest.mark.parametrize("snr_db", [None, 10])
+def test_gapless_clip_keeps_speech(snr_db):
+    pcm = _clip(0, 4, 0, snr_db=snr_db)
+    result = VoiceActivityDetector().split(pcm)
+    assert _covered_seconds(result, 0, 4) > 3.9
+
+
+def test_silence_falls_back_to_whole_recording():
+    pcm = bytes(2 * SAMPLE_RATE)
+    vad = VoiceActivityDetector()
+    result = vad.split(pcm)
+    assert result.segments == [pcm]
+    assert vad.stats()["fallbacks"] == 1
+
+
+def test_mostly_silent_clip_is_still_trimmed():
+    result = VoiceActivityDetector().split(_clip(4, 1, 4, snr_db=20))
+    assert _covered_seconds(result, 4, 5) > 0.9
+    assert result.speech_ratio < 0.5